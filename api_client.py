@@ -0,0 +1,47 @@
+"""HTTP client shared by the Streamlit pages."""
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+# GET responses remembered for revalidation, least recently used dropped first.
+MAX_REMEMBERED_RESPONSES = 256
+
+
+class RevalidatingSession(requests.Session):
+    """
+    Pooled session that remembers GET responses carrying an ETag and
+    revalidates them with If-None-Match. On a 304 the remembered response is
+    returned, so unchanged data costs a round trip but no body, and new data
+    (e.g. a newly parsed standard) is picked up on the next call.
+    """
+
+    def __init__(self, max_entries: int = MAX_REMEMBERED_RESPONSES):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.max_entries = max_entries
+        self.remembered = OrderedDict()  # url -> response
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        if kwargs.get("stream"):
+            return super().get(url, **kwargs)
+        key = requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+        with self.lock:
+            previous = self.remembered.get(key)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if previous is not None:
+            headers["If-None-Match"] = previous.headers["ETag"]
+        response = super().get(url, headers=headers, **kwargs)
+        with self.lock:
+            if response.status_code == 304 and previous is not None:
+                self.remembered.move_to_end(key)
+                return previous
+            if response.status_code == 200 and "ETag" in response.headers:
+                self.remembered[key] = response
+                self.remembered.move_to_end(key)
+                while len(self.remembered) > self.max_entries:
+                    self.remembered.popitem(last=False)
+        return response
@@ -1,94 +1,967 @@
-from fastapi import FastAPI, Depends, UploadFile, HTTPException
+from fastapi import FastAPI, Depends, UploadFile, HTTPException, Request, Response, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from database import get_db
-from models import Standard, Section
-from parser import parse_standard_pdf
+from database import get_db, SessionLocal
+from models import Standard, Section, Passage
+from jobs import ingest_queue, IngestJob
+from migrations import upgrade_schema
+from retrieval import retrieve_sections, build_context
+from embeddings import get_semantic_index, get_encoder
+from streaming import ThinkFilter, sse_event, THINK_OPEN, THINK_CLOSE
+from chat_cache import ChatCache
+from limits import ConcurrencyLimiter, Saturated
+from llm import get_provider, ProviderNotConfigured
+from topic_coverage import coverage_matrix, COVERAGE_TOPICS
+from query_cache import search_cache, normalize_query, corpus_version
+from section_tree import subtree_range
+from conversations import ConversationStore, summary_messages, turn_messages, SUMMARY_MAX_TOKENS
+from search_index import (
+    rebuild_search_index, match_sections, count_matches_by_standard,
+)
+from pydantic import BaseModel
+from sqlalchemy import select
+import asyncio
+import hashlib
+import json
+import os
+try:
+    import orjson
+except ImportError:
+    orjson = None
 app = FastAPI()
+# JSON bodies over GZIP_MIN_SIZE bytes are gzipped for clients that accept it
+# (server-sent events are left alone so they still arrive as they're written).
+GZIP_MIN_SIZE = 1000
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
 
+with SessionLocal() as _db:
+    upgrade_schema(_db)
 
-from groq import Groq
-import os
 
+# Upstream chat calls go through the configured provider (see llm.py). At most
+# MAX_CONCURRENT_CHATS run at once; up to MAX_QUEUED_CHATS more wait up to
+# CHAT_QUEUE_TIMEOUT seconds for a slot, the rest get 429 + Retry-After.
+MAX_CONCURRENT_CHATS = int(os.environ.get("MAX_CONCURRENT_CHATS", 8))
+MAX_QUEUED_CHATS = int(os.environ.get("MAX_QUEUED_CHATS", 32))
+CHAT_QUEUE_TIMEOUT = float(os.environ.get("CHAT_QUEUE_TIMEOUT", 10))
+CHAT_TIMEOUT = float(os.environ.get("CHAT_TIMEOUT", 120))
+CHAT_RETRY_AFTER = 5
+
+_llm = None
+chat_limiter = ConcurrencyLimiter(MAX_CONCURRENT_CHATS, MAX_QUEUED_CHATS, CHAT_QUEUE_TIMEOUT, CHAT_RETRY_AFTER)
+
+def get_llm():
+    """
+    The chat provider, created on first use so that the read endpoints start
+    without LLM credentials. Raises 503 while the provider is not configured.
+    """
+    global _llm
+    if _llm is None:
+        try:
+            _llm = get_provider(max_connections=MAX_CONCURRENT_CHATS, timeout=CHAT_TIMEOUT)
+        except ProviderNotConfigured as e:
+            raise HTTPException(status_code=503, detail=f"Chat is unavailable: {e}")
+    return _llm
 
-GROQ_API_KEY = "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"
+# Read endpoints whose responses only change when a standard is ingested.
+ETAG_PATHS = {
+    "/standards", "/sections", "/sections/stream",
+    "/search", "/search/stream", "/search/multi", "/coverage",
+}
+# Plus /sections/{id}/subtree and /standards/{id}/toc.
+ETAG_PATH_SUFFIXES = ("/subtree", "/toc")
+# Mixed into every ETag: responses also depend on the configured topic list,
+# which can change across a restart without any ingestion.
+ETAG_SALT = hashlib.sha1(json.dumps(COVERAGE_TOPICS).encode("utf-8")).hexdigest()[:12]
 
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
 
-groq_client = Groq(api_key=GROQ_API_KEY)
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """
+    Strong ETags on the read endpoints, derived from the corpus version, the
+    topic list and the URL. A client that revalidates with If-None-Match gets
+    an empty 304 without the endpoint running, until the next ingestion
+    changes the tag. Gzipped bodies get their own tag, since they are a
+    different representation of the same URL.
+    """
+    path = request.url.path
+    if request.method != "GET" or not (path in ETAG_PATHS or path.endswith(ETAG_PATH_SUFFIXES)):
+        return await call_next(request)
+    version = corpus_version.value or await run_in_threadpool(corpus_version.get)
+    key = f"{version} {ETAG_SALT} {request.url.path}?{request.url.query}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+    identity_tag, gzip_tag = f'"{digest}"', f'"{digest}-gzip"'
+    candidates = [identity_tag]
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        candidates.append(gzip_tag)
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    matched = next((tag for tag in candidates if etag_matches(if_none_match, tag)), None)
+    if matched:
+        return Response(status_code=304, headers=dict(headers, ETag=matched))
+    response = await call_next(request)
+    if response.status_code == 200:
+        gzipped = response.headers.get("content-encoding") == "gzip"
+        response.headers.update(dict(headers, ETag=gzip_tag if gzipped else identity_tag))
+    return response
 
 @app.get("/")
 def root():
     return {"message": "Standards backend running 🚀"}
 
-@app.get("/standards")
+def render_json(content) -> bytes:
+    """JSON bytes for plain data (dicts, lists, strings, numbers, None), with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """
+    JSON response for plain data or already rendered JSON bytes. Returned
+    directly from handlers, so FastAPI skips jsonable_encoder; rows are
+    selected as plain columns rather than ORM objects to go with it.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return content if isinstance(content, bytes) else render_json(content)
+
+# Response shapes, for the API docs; handlers build plain dicts from rows.
+class StandardOut(BaseModel):
+    id: int
+    name: str
+    version: str | None = None
+    file_path: str | None = None
+    content_hash: str | None = None
+    revision: int | None = None
+
+class SectionOut(BaseModel):
+    id: int
+    standard_id: int | None = None
+    section_number: str | None = None
+    title: str | None = None
+    content: str | None = None
+    first_page: int | None = None
+    last_page: int | None = None
+
+class SectionPage(BaseModel):
+    sections: list[SectionOut]
+    next_after_id: int | None = None
+
+class TreeNodeOut(BaseModel):
+    id: int
+    parent_id: int | None = None
+    depth: int | None = None
+    section_number: str | None = None
+    title: str | None = None
+    first_page: int | None = None
+    last_page: int | None = None
+    content: str | None = None
+    matches: int | None = None
+
+class SectionTreeOut(BaseModel):
+    standard_id: int
+    sections: list[TreeNodeOut]
+
+STANDARD_COLUMNS = [getattr(Standard, name) for name in StandardOut.model_fields]
+SECTION_COLUMNS = [getattr(Section, name) for name in SectionOut.model_fields]
+TREE_COLUMNS = [
+    Section.id, Section.parent_id, Section.depth, Section.section_number, Section.title,
+    Section.first_page, Section.last_page,
+]
+
+@app.get("/standards", response_model=list[StandardOut])
 def list_standards(db: Session = Depends(get_db)):
-    return db.query(Standard).all()
+    rows = db.execute(select(*STANDARD_COLUMNS).order_by(Standard.id)).mappings()
+    return FastJSONResponse([dict(row) for row in rows])
 
-@app.get("/sections")
-def list_sections(db: Session = Depends(get_db)):
-    return db.query(Section).limit(100).all()
+@app.get("/sections", response_model=SectionPage)
+def list_sections(limit: int = 100, after_id: int = None, db: Session = Depends(get_db)):
+    """
+    Page through all sections in id order.
 
-@app.post("/parse")
-def parse_pdf(standard_name: str, version: str = None, file_path: str = None, start:int=0, db: Session = Depends(get_db)):
+    Pass the returned `next_after_id` as `after_id` to fetch the next page;
+    it is null on the last page.
+
+    Example:
+        /sections?limit=100&after_id=200
     """
+    check_limit(limit)
+    query = select(*SECTION_COLUMNS).order_by(Section.id)
+    if after_id is not None:
+        query = query.where(Section.id > after_id)
+    sections = [dict(row) for row in db.execute(query.limit(limit + 1)).mappings()]
+    next_after_id = sections[limit - 1]["id"] if len(sections) > limit else None
+    return FastJSONResponse({"sections": sections[:limit], "next_after_id": next_after_id})
+
+@app.get("/sections/stream")
+def stream_sections(after_id: int = None, fields: str = None):
+    """
+    Stream every section (after `after_id`) in id order as NDJSON, one JSON
+    object per line.
+    """
+    columns = section_columns(fields)
+
+    def build_query(db):
+        query = db.query(*columns).order_by(Section.id)
+        if after_id is not None:
+            query = query.filter(Section.id > after_id)
+        return query
+
+    return stream_ndjson(build_query)
+
+def tree_nodes(db: Session, standard_id: int, query, q: str = None, path_range: tuple = None) -> list:
+    """
+    Rows of a section tree query (ordered by path) as dicts. With `q`, each
+    node gets "matches": how many sections of its subtree match `q`. Every
+    match adds one to each of its ancestors in the result, which are the
+    prefixes of its path, so the work is proportional to the matches found
+    rather than to the size of the standard.
+    """
+    rows = db.execute(query.add_columns(Section.path)).mappings()
+    nodes = {}
+    for row in rows:
+        node = dict(row)
+        nodes[node.pop("path")] = node
+        if q:
+            node["matches"] = 0
+    if q:
+        matched = match_sections(db, q, standard_id, Section.path).order_by(None)
+        if path_range:
+            matched = matched.filter(Section.path >= path_range[0], Section.path < path_range[1])
+        try:
+            matched_paths = [path for path, in matched]
+        except OperationalError:
+            raise HTTPException(status_code=400, detail=f"Invalid search query '{q}'.")
+        for path in matched_paths:
+            parts = path.split("/")
+            for i in range(1, len(parts) + 1):
+                node = nodes.get("/".join(parts[:i]))
+                if node is not None:
+                    node["matches"] += 1
+    return list(nodes.values())
+
+@app.get("/sections/{section_id}/subtree", response_model=SectionTreeOut)
+def get_subtree(section_id: int, content: bool = False, q: str = None, db: Session = Depends(get_db)):
+    """
+    A section and all of its descendants in document order, read as one
+    range of the (standard_id, path) index. `content=true` includes the
+    section texts; `q` adds per-node match counts rolled up over each
+    node's subtree.
+
+    Example:
+        /sections/42/subtree
+        /sections/42/subtree?q=risk
+    """
+    root = db.execute(select(Section.standard_id, Section.path).where(Section.id == section_id)).first()
+    if not root:
+        raise HTTPException(status_code=404, detail=f"Section {section_id} not found.")
+    low, high = subtree_range(root.path)
+    columns = TREE_COLUMNS + [Section.content] if content else TREE_COLUMNS
+    query = (
+        select(*columns)
+        .where(Section.standard_id == root.standard_id, Section.path >= low, Section.path < high)
+        .order_by(Section.path)
+    )
+    sections = tree_nodes(db, root.standard_id, query, q, (low, high))
+    return FastJSONResponse({"standard_id": root.standard_id, "sections": sections})
+
+@app.get("/standards/{standard_id}/toc", response_model=SectionTreeOut)
+def get_table_of_contents(standard_id: int, max_depth: int = None, q: str = None, db: Session = Depends(get_db)):
+    """
+    Table of contents of a standard: its sections in document order with
+    their parent and depth, down to `max_depth` (0 for top-level sections
+    only). `q` adds per-entry match counts that include the sections below
+    `max_depth`.
+
+    Example:
+        /standards/1/toc?max_depth=1
+        /standards/1/toc?max_depth=0&q=risk
+    """
+    if not db.get(Standard, standard_id):
+        raise HTTPException(status_code=404, detail=f"Standard {standard_id} not found.")
+    query = select(*TREE_COLUMNS).where(Section.standard_id == standard_id).order_by(Section.path)
+    if max_depth is not None:
+        query = query.where(Section.depth <= max_depth)
+    sections = tree_nodes(db, standard_id, query, q)
+    return FastJSONResponse({"standard_id": standard_id, "sections": sections})
+
+@app.post("/parse", status_code=202)
+def parse_pdf(standard_name: str, version: str = None, file_path: str = None, start:int=0, workers: int = 1):
+    """
+    Queue a PDF for ingestion and return its job id straight away.
+    Poll GET /jobs/{job_id} for progress and the final status.
+
     Example call:
     POST /parse?standard_name=ISO9001&file_path=files/ISO9001.pdf
+    POST /parse?standard_name=ISO9001&file_path=files/ISO9001.pdf&workers=4
     """
-    parse_standard_pdf(file_path, db, standard_name, version,start)
-    return {"message": f"Parsed {standard_name}"}
+    if not file_path or not os.path.isfile(file_path):
+        raise HTTPException(status_code=400, detail=f"File '{file_path}' not found.")
+    max_workers = os.cpu_count() or 1
+    if not 1 <= workers <= max_workers:
+        raise HTTPException(status_code=400, detail=f"workers must be between 1 and {max_workers}.")
+    job = ingest_queue.submit(IngestJob(standard_name, file_path, version, start, workers))
+    return {"message": f"Queued {standard_name}", "job_id": job.id, "status": job.status}
 
 
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Status of an ingestion job: queued, running, succeeded or failed, with
+    pages extracted and sections written so far.
+    """
+    job = ingest_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job.to_dict()
+
+
+@app.post("/search/reindex")
+def reindex_sections(db: Session = Depends(get_db)):
+    """
+    Rebuild the full-text index from the passages table.
+    """
+    rebuild_search_index(db)
+    return {"message": "Search index rebuilt"}
+
+
+SECTION_FIELDS = ("id", "standard_id", "section_number", "title", "content")
+# Search hits can also return their best-matching passage (see passages.py),
+# and do so by default instead of the content, so a hit is never bigger than
+# a passage however long its section is.
+PASSAGE_FIELDS = {"passage": Passage.text, "passage_start": Passage.start_char, "passage_end": Passage.end_char}
+MATCH_FIELDS = SECTION_FIELDS + tuple(PASSAGE_FIELDS)
+DEFAULT_MATCH_FIELDS = ("id", "standard_id", "section_number", "title", "passage", "passage_start", "passage_end")
+MAX_SNIPPET_TOKENS = 64
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def section_columns(fields: str = None, with_id: bool = False, allowed: tuple = SECTION_FIELDS,
+                    default: tuple = SECTION_FIELDS):
+    """
+    Columns to select for the `fields` query option, `default` when it is
+    not given. `with_id` makes sure Section.id is included.
+    """
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(default)
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}.",
+        )
+    if with_id and "id" not in names:
+        names.insert(0, "id")
+    return [PASSAGE_FIELDS[name].label(name) if name in PASSAGE_FIELDS else getattr(Section, name) for name in names]
+
+def match_columns(fields: str = None, snippet: int = None, with_id: bool = False):
+    """Columns to select for the `fields` option of the search endpoints; also checks `snippet`."""
+    if snippet is not None and not 1 <= snippet <= MAX_SNIPPET_TOKENS:
+        raise HTTPException(status_code=400, detail=f"snippet must be between 1 and {MAX_SNIPPET_TOKENS}.")
+    return section_columns(fields, with_id, allowed=MATCH_FIELDS, default=DEFAULT_MATCH_FIELDS)
+
+def check_limit(limit: int):
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+
+def stream_ndjson(build_query):
+    """
+    Stream the rows of `build_query(db)` as NDJSON, fetched from a
+    server-side cursor STREAM_BATCH_SIZE rows at a time. The query gets its
+    own session because the body is produced after the handler returns.
+    """
+    def generate():
+        db = SessionLocal()
+        try:
+            for row in build_query(db).yield_per(STREAM_BATCH_SIZE):
+                yield render_json(dict(row._mapping)) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+def get_standard_by_name(db: Session, standard_name: str):
+    standard = db.query(Standard).filter(Standard.name == standard_name).first()
+    if not standard:
+        raise HTTPException(status_code=404, detail=f"Standard '{standard_name}' not found.")
+    return standard
+
+def get_standard_ids(db: Session, names: list) -> dict:
+    """{name: id} for the named standards in the given order; 404 if any is missing."""
+    found = {}
+    for standard_id, name in db.query(Standard.id, Standard.name).filter(Standard.name.in_(names)).order_by(Standard.id):
+        found.setdefault(name, standard_id)
+    missing = [name for name in names if name not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Standard(s) not found: {', '.join(missing)}.")
+    return {name: found[name] for name in names}
+
 @app.get("/search")
-def search_sections(q: str, standard_name: str, db: Session = Depends(get_db)):
+def search_sections(
+    q: str,
+    standard_name: str,
+    count_only: bool = False,
+    fields: str = None,
+    snippet: int = None,
+    limit: int = None,
+    after_id: int = None,
+    db: Session = Depends(get_db),
+):
     """
-    Search for a keyword or phrase in section titles or content
-    within a specific standard.
+    Full-text search over section titles and content within a specific
+    standard, best matches (BM25) first. Sections are searched passage by
+    passage and rank by their best passage, which each result includes as
+    "passage" with its character offsets in the section content.
+
+    Plain terms are ANDed together; FTS5 syntax is also accepted for
+    phrases ("risk register"), prefixes (stakeholder*) and boolean
+    queries (risk NOT financial).
+
+    Optional parameters keep responses small:
+        count_only=true     return only {"count": n}
+        fields=id,title     return only these columns (section columns, or
+                            passage, passage_start, passage_end)
+        snippet=20          add a "snippet" of the best-matching window of
+                            the passage (up to 64 tokens), matches in <mark>
+        limit=50            return one page as {"results": [...], "next_after_id": id}
+        after_id=123        continue the ranked listing after this section
+
+    Results are cached in process until the standard is re-ingested (see
+    query_cache.py), so repeated searches don't touch the database.
 
     Example:
         /search?q=risk&standard_name=ISO9001
+        /search?q=risk&standard_name=ISO9001&fields=id,title&snippet=20
+        /search?q=risk&standard_name=ISO9001&limit=50&after_id=123
     """
     if not q or len(q.strip()) == 0:
         raise HTTPException(status_code=400, detail="Query string 'q' cannot be empty.")
+    check_limit(limit)
+    columns = match_columns(fields, snippet, with_id=limit is not None)
 
-    
-    standard = db.query(Standard).filter(Standard.name == standard_name).first()
-    if not standard:
-        raise HTTPException(status_code=404, detail=f"Standard '{standard_name}' not found.")
+    def run_search():
+        standard = get_standard_by_name(db, standard_name)
+        try:
+            if count_only:
+                return {"count": match_sections(db, q, standard.id).order_by(None).count()}
+            query = match_sections(db, q, standard.id, *columns, after_id=after_id, snippet=snippet)
+            results = query.limit(limit + 1).all() if limit else query.all()
+        except OperationalError:
+            raise HTTPException(status_code=400, detail=f"Invalid search query '{q}'.")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    
-    results = (
-        db.query(Section)
-        .filter(
-            Section.standard_id == standard.id,
-            (Section.title.ilike(f"%{q}%")) |
-            (Section.content.ilike(f"%{q}%"))
-        )
-        .all()
+        results = [dict(row._mapping) for row in results]
+
+        if limit:
+            next_after_id = None
+            if len(results) > limit:
+                results = results[:limit]
+                next_after_id = results[-1]["id"]
+            return {"results": results, "next_after_id": next_after_id}
+
+        if not results:
+            return {"message": f"No matches found for '{q}' in standard '{standard_name}'."}
+
+        return results
+
+    # Cached as rendered JSON, so a hit skips serialisation too.
+    key = ("search", normalize_query(q), standard_name, count_only, fields, snippet, limit, after_id)
+    return FastJSONResponse(search_cache.get_or_compute(key, standard_name, lambda: render_json(run_search())))
+
+@app.get("/search/stream")
+def stream_search(
+    q: str,
+    standard_name: str,
+    fields: str = None,
+    snippet: int = None,
+    after_id: int = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Same as /search, but streams every match as NDJSON (one JSON object per
+    line, best match first) instead of building one response body.
+    """
+    if not q or len(q.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Query string 'q' cannot be empty.")
+    columns = match_columns(fields, snippet)
+
+    standard = get_standard_by_name(db, standard_name)
+
+    # Surface query errors as a 400 before the streaming response starts.
+    try:
+        match_sections(db, q, standard.id, Section.id, after_id=after_id).first()
+    except OperationalError:
+        raise HTTPException(status_code=400, detail=f"Invalid search query '{q}'.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return stream_ndjson(
+        lambda stream_db: match_sections(stream_db, q, standard.id, *columns, after_id=after_id, snippet=snippet)
     )
 
-    if not results:
-        return {"message": f"No matches found for '{q}' in standard '{standard_name}'."}
+def search_one_standard(standard_id: int, q: str, columns: list, limit: int = None, snippet: int = None) -> list:
+    """Ranked matches in one standard, on a session of its own so several can run at once."""
+    with SessionLocal() as db:
+        query = match_sections(db, q, standard_id, *columns, snippet=snippet)
+        if limit:
+            query = query.limit(limit)
+        return [dict(row._mapping) for row in query]
 
-    return results
+@app.get("/search/multi")
+async def search_multiple_standards(
+    q: str,
+    standards: str,
+    fields: str = None,
+    snippet: int = None,
+    limit: int = None,
+):
+    """
+    Run the same search in several standards at once and return the matches
+    grouped by standard. The per-standard queries run concurrently, so
+    comparing five standards takes about as long as searching one.
+
+    Accepts the fields, snippet and limit options of /search (limit applies
+    per standard).
+
+    Example:
+        /search/multi?q=risk&standards=PMBOK,PRINCE2,ISO&fields=id,title&snippet=20
+    """
+    if not q or len(q.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Query string 'q' cannot be empty.")
+    names = list(dict.fromkeys(name.strip() for name in standards.split(",") if name.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="standards cannot be empty.")
+    check_limit(limit)
+    columns = match_columns(fields, snippet)
+
+    keys = {name: ("multi", normalize_query(q), name, fields, snippet, limit) for name in names}
+    results = {name: search_cache.get(keys[name]) for name in names}
+    uncached = [name for name in names if results[name] is None]
+    if uncached:
+        with SessionLocal() as db:
+            standard_ids = get_standard_ids(db, uncached)
+
+        def search_and_cache(name: str):
+            generation = search_cache.generation(name)
+            found = search_one_standard(standard_ids[name], q, columns, limit, snippet)
+            search_cache.put(keys[name], found, name, generation)
+            return found
+
+        try:
+            grouped = await asyncio.gather(*(run_in_threadpool(search_and_cache, name) for name in uncached))
+        except OperationalError:
+            raise HTTPException(status_code=400, detail=f"Invalid search query '{q}'.")
+        results.update(zip(uncached, grouped))
+
+    return FastJSONResponse({"q": q, "results": {name: results[name] for name in names}})
+
+@app.get("/search/cache/stats")
+def search_cache_stats():
+    """Search result cache size, approximate memory use and hit/miss counters since startup."""
+    return search_cache.stats()
+
+
+@app.get("/semantic_search")
+def semantic_search(q: str, k: int = 10, standard_name: str = None, db: Session = Depends(get_db)):
+    """
+    Sections closest in meaning to `q` (cosine similarity of local
+    embeddings), so "threat" also finds sections about risk. Needs the index
+    built by `python embeddings.py`.
+
+    Example:
+        /semantic_search?q=threat assessment&k=5&standard_name=PRINCE2
+    """
+    if not q or len(q.strip()) == 0:
+        raise HTTPException(status_code=400, detail="Query string 'q' cannot be empty.")
+    check_limit(k)
+    standard_id = get_standard_by_name(db, standard_name).id if standard_name else None
+
+    try:
+        index = get_semantic_index()
+        query = get_encoder().encode([q])[0]
+    except (FileNotFoundError, RuntimeError) as e:
+        raise HTTPException(status_code=503, detail=f"Semantic search unavailable: {e}")
+    hits = index.search(query, k, standard_id)
+
+    # Sections removed since the index was built are skipped.
+    sections = {
+        row.id: row for row in db.query(
+            Section.id, Section.standard_id, Section.section_number, Section.title,
+        ).filter(Section.id.in_([section_id for section_id, _ in hits]))
+    }
+    return [
+        dict(sections[section_id]._mapping, score=round(score, 4))
+        for section_id, score in hits if section_id in sections
+    ]
+
+
+class CoverageRequest(BaseModel):
+    topics: list[str]
+    standards: list[str]
+
+@app.post("/coverage")
+def topic_coverage(req: CoverageRequest, db: Session = Depends(get_db)):
+    """
+    Count matching sections for every topic x standard pair in one call.
+
+    Returns a compact matrix where counts[i][j] is the number of sections
+    of standards[j] matching topics[i]:
+        {"topics": [...], "standards": [...], "counts": [[...], ...]}
+    """
+    standard_ids = get_standard_ids(db, req.standards)
+
+    counts = []
+    for topic in req.topics:
+        if not topic.strip():
+            raise HTTPException(status_code=400, detail="Topics cannot be empty.")
+        try:
+            by_standard = count_matches_by_standard(db, topic, list(standard_ids.values()))
+        except OperationalError:
+            raise HTTPException(status_code=400, detail=f"Invalid topic query '{topic}'.")
+        counts.append([by_standard.get(standard_ids[name], 0) for name in req.standards])
+
+    return {"topics": req.topics, "standards": req.standards, "counts": counts}
+
+@app.get("/coverage")
+def stored_topic_coverage(standards: str, sections: bool = False, db: Session = Depends(get_db)):
+    """
+    Coverage of the Dashboard topics (COVERAGE_TOPICS) in the given
+    standards, read from the topic_coverage table that is refreshed when a
+    standard is parsed, so the cost does not grow with the corpus. For other
+    topics, POST them to /coverage.
+
+    counts[i][j] is the number of sections of standards[j] matching
+    topics[i] and scores[i][j] their summed relevance; sections=true adds
+    the matching section ids, most relevant first:
+        {"topics": [...], "standards": [...], "counts": [[...]], "scores": [[...]]}
+
+    Example:
+        /coverage?standards=PMBOK,PRINCE2
+    """
+    names = list(dict.fromkeys(name.strip() for name in standards.split(",") if name.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="standards cannot be empty.")
+    return coverage_matrix(db, get_standard_ids(db, names), with_sections=sections)
 
-from pydantic import BaseModel
 import re
 class ChatRequest(BaseModel):
     question: str
+    conversation_id: str = None
+
+SYSTEM_PROMPT = "You are a helpful assistant specialized in project management. answer related questions clearly and concisely, othewise dont"
+GROUNDING_PROMPT = (
+    "Base your answer on these excerpts from project management standards where they are relevant, "
+    "and cite them by their bracketed label, e.g. [PMBOK 2.3].\n\n"
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+def build_chat_messages(db: Session, question: str, summary: str = None, history: list = ()):
+    """
+    Prompt for a question, grounded in the most relevant sections of the
+    ingested standards. For follow-ups, the summary of older turns and the
+    recent turns are included, and retrieval also uses the previous question
+    so that "what about PRINCE2?" finds the right sections.
+
+    Returns:
+        tuple: (chat messages, citations for the sections in the prompt)
+    """
+    retrieval_query = f"{history[-1].question} {question}" if history else question
+    context, citations = build_context(retrieve_sections(db, retrieval_query))
+    system_prompt = SYSTEM_PROMPT
+    if summary:
+        system_prompt += "\n\n" + SUMMARY_PREFIX + summary
+    if context:
+        system_prompt += "\n\n" + GROUNDING_PROMPT + context
+    messages = [
+        {"role": "system", "content": system_prompt},
+        *turn_messages(history),
+        {"role": "user", "content": question + " Refuse to Answer if its not relevant to Project Management"},
+    ]
+    return messages, citations
+
+def strip_think(raw: str) -> str:
+    """Model output without its leading <think> block."""
+    return re.sub(r"^<think>.*?</think>\s*", "", raw, flags=re.DOTALL).strip()
+
+chat_cache = ChatCache(encoder_factory=get_encoder)
+conversations = ConversationStore()
+
+def cache_bypassed(request: Request) -> bool:
+    """True when the client asked for a fresh answer with `Cache-Control: no-cache`."""
+    return "no-cache" in request.headers.get("cache-control", "").lower()
+
+def saturated_error(e: Saturated):
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+def database_busy_error():
+    return HTTPException(
+        status_code=503,
+        detail="The database is busy ingesting a standard, try again shortly.",
+        headers={"Retry-After": str(CHAT_RETRY_AFTER)},
+    )
+
+# The chat handlers open a short-lived session for each database step rather
+# than taking one from get_db, so requests waiting on the limiter or the model
+# don't hold pooled connections that searches need.
+#
+# An ingestion holds SQLite's write lock until it commits, so a chat only
+# reads until it has an answer: new conversations are stored with their
+# first turn, and cache and history writes are best effort and run after
+# the answer has been sent.
+def cached_answer(question: str):
+    """Cached (answer, citations), or None on a miss or if the cache can't be read."""
+    try:
+        with SessionLocal() as db:
+            return chat_cache.get(db, question)
+    except OperationalError:
+        return None
+
+def chat_messages(question: str, summary: str = None, history: list = ()):
+    with SessionLocal() as db:
+        return build_chat_messages(db, question, summary, history)
+
+def cache_answer(question: str, answer: str, citations: list, generation: int):
+    """Cache an answer unless a standard was ingested (and the cache cleared) while it was written."""
+    if corpus_version.generation != generation:
+        return
+    try:
+        with SessionLocal() as db:
+            chat_cache.put(db, question, answer, citations)
+    except OperationalError as e:
+        print(f"⚠️ Chat answer not cached: {e}")
+
+def open_conversation(conversation_id: str = None):
+    """
+    Start a conversation (only stored with its first turn), or load an
+    existing one's history split into the turns still to be summarised and
+    the recent turns sent verbatim.
+
+    Returns:
+        tuple: (conversation id, summary, turns to summarise, recent turns),
+        or None if the conversation does not exist
+    """
+    try:
+        with SessionLocal() as db:
+            if conversation_id is None:
+                return conversations.new_id(), None, [], []
+            conversation = conversations.get(db, conversation_id)
+            if conversation is None:
+                return None
+            to_summarise, history = conversations.window(db, conversation)
+            return conversation.id, conversation.summary, to_summarise, history
+    except OperationalError:
+        raise database_busy_error()
+
+def save_summary(conversation_id: str, summary: str, through: int):
+    """Store the summary; if that fails the same turns are summarised again next time."""
+    try:
+        with SessionLocal() as db:
+            conversations.save_summary(db, conversation_id, summary, through)
+    except OperationalError as e:
+        print(f"⚠️ Conversation summary not saved: {e}")
+
+def record_turn(conversation_id: str, question: str, answer: str):
+    try:
+        with SessionLocal() as db:
+            conversations.add_turn(db, conversation_id, question, answer)
+    except OperationalError as e:
+        print(f"⚠️ Chat turn not saved: {e}")
+
+async def summarise_history(conversation_id: str, summary: str, turns: list) -> str:
+    """
+    Fold turns that no longer fit the history budget into the stored summary.
+    If the model runs out of tokens inside its <think> block, the old summary
+    is kept and the same turns are tried again on the next question.
+    """
+    raw = await asyncio.wait_for(
+        get_llm().complete(summary_messages(summary, turns), temperature=0, max_tokens=SUMMARY_MAX_TOKENS), CHAT_TIMEOUT,
+    )
+    if raw.startswith(THINK_OPEN) and THINK_CLOSE not in raw:
+        return summary
+    new_summary = strip_think(raw)
+    if not new_summary:
+        return summary
+    await run_in_threadpool(save_summary, conversation_id, new_summary, turns[-1].id)
+    return new_summary
+
+def conversation_not_found(conversation_id: str):
+    return HTTPException(status_code=404, detail=f"Conversation '{conversation_id}' not found.")
 
 @app.post("/chat")
-def chat_with_groq(req: ChatRequest):
+async def chat_with_llm(req: ChatRequest, request: Request, response: Response, background_tasks: BackgroundTasks):
+    """
+    Answer a project management question, grounded in the most relevant
+    sections of the ingested standards. The sections used are returned as
+    citations alongside the answer.
+
+    Every answer carries a conversation_id; send it back with the next
+    question to ask a follow-up. The history is kept server-side, so only
+    the new question is sent: recent turns go into the prompt verbatim up to
+    a token budget and older ones are replaced by a summary written once.
+
+    First questions are cached by normalised question (X-Cache: HIT/MISS);
+    send `Cache-Control: no-cache` to bypass the cache and refresh the entry.
+    Follow-ups depend on the history and are never cached (X-Cache: BYPASS).
+    Returns 503 when no chat provider is configured (e.g. GROQ_API_KEY is not
+    set), 429 with Retry-After when too many chats are in flight, and 504 if
+    the upstream completion takes longer than CHAT_TIMEOUT.
+    """
+    generation = corpus_version.generation
+    bypass = cache_bypassed(request)
+    if bypass:
+        chat_cache.record_bypass()
+    elif req.conversation_id is None:
+        cached = await run_in_threadpool(cached_answer, req.question)
+        if cached:
+            response.headers["X-Cache"] = "HIT"
+            answer, citations = cached
+            conversation_id = conversations.new_id()
+            background_tasks.add_task(record_turn, conversation_id, req.question, answer)
+            return {"answer": answer, "citations": citations, "conversation_id": conversation_id}
+
+    llm = get_llm()
+    opened = await run_in_threadpool(open_conversation, req.conversation_id)
+    if opened is None:
+        raise conversation_not_found(req.conversation_id)
+    conversation_id, summary, to_summarise, history = opened
+    follow_up = bool(summary or to_summarise or history)
+
     try:
-        response = groq_client.chat.completions.create(
-            model="deepseek-r1-distill-llama-70B",   
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant specialized in project management. answer related questions clearly and concisely, othewise dont"},
-                {"role": "user", "content": req.question + " Refuse to Answer if its not relevant to Project Management"},
-            ],
-            temperature=0.3,
-            max_tokens=4096,
-        )
-        raw = response.choices[0].message.content
-        cleaned = re.sub(r"^<think>.*?</think>\s*", "", raw, flags=re.DOTALL)
-        return {"answer": cleaned.strip()}
+        async with chat_limiter.slot():
+            if to_summarise:
+                summary = await summarise_history(conversation_id, summary, to_summarise)
+            messages, citations = await run_in_threadpool(chat_messages, req.question, summary, history)
+            raw = await asyncio.wait_for(llm.complete(messages, temperature=0.3, max_tokens=4096), CHAT_TIMEOUT)
+        cleaned = strip_think(raw)
+        if cleaned:
+            if not follow_up:
+                background_tasks.add_task(cache_answer, req.question, cleaned, citations, generation)
+            background_tasks.add_task(record_turn, conversation_id, req.question, cleaned)
+        response.headers["X-Cache"] = "BYPASS" if bypass or follow_up else "MISS"
+        return {"answer": cleaned, "citations": citations, "conversation_id": conversation_id}
+    except Saturated as e:
+        raise saturated_error(e)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Upstream chat completion timed out after {CHAT_TIMEOUT:g}s.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/chat/stream")
+async def stream_chat_with_llm(req: ChatRequest, request: Request):
+    """
+    Same as /chat, but streams the answer as server-sent events while it is
+    generated, with the model's <think> block left out:
+
+        data: {"delta": "..."}                    one per piece of answer text
+        event: done\ndata: {"citations": [...], "conversation_id": "..."}
+                                                  once the answer is complete
+        event: error\ndata: {"detail": "..."}     if generation fails
+
+    Cached answers are sent as a single delta. The upstream slot is held
+    until the stream ends; 429 + Retry-After when none frees up in time. A
+    stream still running after CHAT_TIMEOUT seconds ends with an error event.
+    """
+    generation = corpus_version.generation
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    bypass = cache_bypassed(request)
+    if bypass:
+        chat_cache.record_bypass()
+    elif req.conversation_id is None:
+        cached = await run_in_threadpool(cached_answer, req.question)
+        if cached:
+            answer, citations = cached
+            conversation_id = conversations.new_id()
+            events = [
+                sse_event({"delta": answer}),
+                sse_event({"citations": citations, "conversation_id": conversation_id}, event="done"),
+            ]
+            return StreamingResponse(iter(events), media_type="text/event-stream",
+                                     headers=dict(headers, **{"X-Cache": "HIT"}),
+                                     background=BackgroundTask(record_turn, conversation_id, req.question, answer))
+
+    llm = get_llm()
+    opened = await run_in_threadpool(open_conversation, req.conversation_id)
+    if opened is None:
+        raise conversation_not_found(req.conversation_id)
+    conversation_id, summary, to_summarise, history = opened
+    follow_up = bool(summary or to_summarise or history)
+
+    try:
+        await chat_limiter.acquire()
+    except Saturated as e:
+        raise saturated_error(e)
+
+    async def generate():
+        think_filter = ThinkFilter()
+        answer = []
+        try:
+            history_summary = summary
+            if to_summarise:
+                history_summary = await summarise_history(conversation_id, summary, to_summarise)
+            messages, citations = await run_in_threadpool(chat_messages, req.question, history_summary, history)
+            # One deadline for the whole stream; the client's timeout only bounds each read.
+            async with asyncio.timeout(CHAT_TIMEOUT):
+                async for piece in llm.stream(messages, temperature=0.3, max_tokens=4096):
+                    text = think_filter.feed(piece)
+                    if text:
+                        answer.append(text)
+                        yield sse_event({"delta": text})
+            text = think_filter.finish()
+            if text:
+                answer.append(text)
+                yield sse_event({"delta": text})
+            yield sse_event({"citations": citations, "conversation_id": conversation_id}, event="done")
+        except asyncio.TimeoutError:
+            detail = f"Upstream chat completion timed out after {CHAT_TIMEOUT:g}s."
+            yield sse_event({"detail": detail}, event="error")
+            return
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+            return
+        finally:
+            chat_limiter.release()
+        cleaned = "".join(answer).strip()
+        if cleaned:
+            if not follow_up:
+                await run_in_threadpool(cache_answer, req.question, cleaned, citations, generation)
+            await run_in_threadpool(record_turn, conversation_id, req.question, cleaned)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers=dict(headers, **{"X-Cache": "BYPASS" if bypass or follow_up else "MISS"}),
+    )
+
+@app.get("/conversations/{conversation_id}")
+def get_conversation(conversation_id: str, db: Session = Depends(get_db)):
+    """A conversation's turns and the summary that stands in for the older ones."""
+    conversation = conversations.get(db, conversation_id)
+    if conversation is None:
+        raise conversation_not_found(conversation_id)
+    return conversations.to_dict(db, conversation)
+
+@app.delete("/conversations/{conversation_id}")
+def delete_conversation(conversation_id: str, db: Session = Depends(get_db)):
+    """Forget a conversation and its history."""
+    if conversations.get(db, conversation_id) is None:
+        raise conversation_not_found(conversation_id)
+    conversations.delete(db, conversation_id)
+    return {"message": f"Conversation '{conversation_id}' deleted."}
+
+@app.get("/chat/limits")
+def chat_limits():
+    """Upstream chat slots in use, queued requests and 429s since startup."""
+    return chat_limiter.stats()
+
+@app.get("/chat/cache/stats")
+def chat_cache_stats(db: Session = Depends(get_db)):
+    """Chat answer cache size and hit/miss counters since startup."""
+    return chat_cache.stats(db)
@@ -0,0 +1,97 @@
+"""
+Before/after benchmark for the database indexes and SQLite settings.
+
+Copies standards.db to a temporary directory, runs the backend's hot queries
+against it without the indexes and with default settings, then applies
+migrations.upgrade_schema and database.SQLITE_PRAGMAS and runs them again.
+Prints the query plan and median latency of each query in both states.
+
+    python bench_queries.py [path/to/standards.db] [runs]
+"""
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base, SQLITE_PRAGMAS
+from migrations import upgrade_schema
+
+QUERIES = {
+    "standard by name": (
+        "SELECT id FROM standards WHERE name = :name LIMIT 1",
+        {"name": "PRINCE2"},
+    ),
+    "sections of a standard": (
+        "SELECT count(*) FROM sections WHERE standard_id = :standard_id",
+        {"standard_id": 2},
+    ),
+    "section by number": (
+        "SELECT id, title FROM sections WHERE standard_id = :standard_id AND section_number = :number",
+        {"standard_id": 2, "number": "9.2"},
+    ),
+    "full-text search": (
+        "SELECT passages.section_id FROM passages JOIN passages_fts ON passages_fts.rowid = passages.id "
+        "WHERE passages.standard_id = :standard_id AND passages_fts MATCH :match ORDER BY passages_fts.rank",
+        {"standard_id": 2, "match": '"risk"'},
+    ),
+}
+
+
+def drop_indexes(path: str):
+    conn = sqlite3.connect(path)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(f"DROP INDEX IF EXISTS {index.name}")
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.commit()
+    conn.close()
+
+
+def apply_schema(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with sessionmaker(bind=engine)() as db:
+        upgrade_schema(db)
+    engine.dispose()
+
+
+def run_queries(path: str, runs: int, pragmas: dict = None):
+    conn = sqlite3.connect(path)
+    for name, value in (pragmas or {}).items():
+        conn.execute(f"PRAGMA {name}={value}")
+    results = {}
+    for label, (sql, params) in QUERIES.items():
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append(time.perf_counter() - start)
+        results[label] = (plan, statistics.median(timings) * 1e6)
+    conn.close()
+    return results
+
+
+def main(db_path: str = "standards.db", runs: int = 200):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        shutil.copyfile(db_path, path)
+        # The FTS table is needed for the search query in both runs.
+        apply_schema(path)
+        drop_indexes(path)
+        before = run_queries(path, runs)
+        apply_schema(path)
+        after = run_queries(path, runs, SQLITE_PRAGMAS)
+
+    for label in QUERIES:
+        (plan_before, us_before), (plan_after, us_after) = before[label], after[label]
+        print(f"== {label}")
+        print(f"   before: {us_before:9.1f} us  {' | '.join(plan_before)}")
+        print(f"   after:  {us_after:9.1f} us  {' | '.join(plan_after)}")
+
+
+if __name__ == "__main__":
+    main(*(sys.argv[1:2] or ["standards.db"]), *(int(arg) for arg in sys.argv[2:3]))
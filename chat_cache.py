@@ -0,0 +1,155 @@
+import json
+import re
+import threading
+import time
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from models import ChatCacheEntry
+
+# Cached answers expire after CHAT_CACHE_TTL seconds; beyond CHAT_CACHE_MAX_ENTRIES
+# the least recently used entries are evicted.
+CHAT_CACHE_TTL = 7 * 24 * 3600
+CHAT_CACHE_MAX_ENTRIES = 1000
+# Questions whose embeddings are at least this similar share an answer. Only
+# used when the local embedding model (see embeddings.py) is available.
+CHAT_CACHE_SIMILARITY = 0.95
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    """Cache key for a question: lower case, no punctuation, single spaces."""
+    return " ".join(PUNCTUATION.sub(" ", question.lower()).split())
+
+
+def clear_chat_cache(db: Session):
+    """
+    Drop every cached answer. Answers cite sections and reflect the standards
+    ingested when they were written, so ingestion calls this in its own
+    transaction. Does not commit.
+    """
+    db.query(ChatCacheEntry).delete()
+
+
+class ChatCache:
+    """
+    Answer cache for /chat stored in the chat_cache table, so it survives
+    restarts. Lookups are by normalised question, falling back to the most
+    similar cached question when near-duplicate matching is available.
+    """
+
+    def __init__(self, ttl: float = CHAT_CACHE_TTL, max_entries: int = CHAT_CACHE_MAX_ENTRIES,
+                 similarity: float = CHAT_CACHE_SIMILARITY, encoder_factory=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.encoder_factory = encoder_factory
+        self.encoder = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        # {key: (last_used_at, hits)} of hits not yet written, see get().
+        self.touched = {}
+
+    def encode(self, question: str):
+        """Question embedding, or None if no local embedding model is available."""
+        if self.encoder_factory is None:
+            return None
+        if self.encoder is None:
+            try:
+                self.encoder = self.encoder_factory()
+            except Exception:
+                self.encoder_factory = None  # don't retry on every request
+                return None
+        return self.encoder.encode([question])[0]
+
+    def get(self, db: Session, question: str):
+        """
+        Cached (answer, citations) for a question, or None on a miss. Only
+        reads, so hits are served while an ingestion holds the write lock;
+        the entry's LRU position and hit count are written by the next put().
+        """
+        now = time.time()
+        key = normalize_question(question)
+        entry = db.get(ChatCacheEntry, key)
+        near = False
+        if entry is None or entry.created_at < now - self.ttl:
+            entry = self.find_similar(db, question, now)
+            near = entry is not None
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            if near:
+                self.near_hits += 1
+            else:
+                self.hits += 1
+            self.touched[entry.key] = (now, self.touched.get(entry.key, (now, 0))[1] + 1)
+        return entry.answer, json.loads(entry.citations or "[]")
+
+    def find_similar(self, db: Session, question: str, now: float):
+        vector = self.encode(question)
+        if vector is None:
+            return None
+        entries = (
+            db.query(ChatCacheEntry)
+            .filter(ChatCacheEntry.embedding.isnot(None), ChatCacheEntry.created_at >= now - self.ttl)
+            .all()
+        )
+        if not entries:
+            return None
+        matrix = np.stack([np.frombuffer(entry.embedding, dtype=np.float32) for entry in entries])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        return entries[best] if scores[best] >= self.similarity else None
+
+    def put(self, db: Session, question: str, answer: str, citations: list):
+        """
+        Store an answer, record the hits since the last put, then drop expired
+        entries and the least recently used overflow.
+        """
+        now = time.time()
+        vector = self.encode(question)
+        with self.lock:
+            touched, self.touched = self.touched, {}
+        for key, (last_used_at, hits) in touched.items():
+            db.query(ChatCacheEntry).filter(ChatCacheEntry.key == key).update(
+                {"last_used_at": last_used_at, "hits": func.coalesce(ChatCacheEntry.hits, 0) + hits},
+                synchronize_session=False,
+            )
+        db.merge(ChatCacheEntry(
+            key=normalize_question(question),
+            question=question,
+            answer=answer,
+            citations=json.dumps(citations),
+            embedding=vector.astype(np.float32).tobytes() if vector is not None else None,
+            created_at=now,
+            last_used_at=now,
+            hits=0,
+        ))
+        db.flush()
+        db.query(ChatCacheEntry).filter(ChatCacheEntry.created_at < now - self.ttl).delete()
+        overflow = db.query(ChatCacheEntry).count() - self.max_entries
+        if overflow > 0:
+            oldest = select(ChatCacheEntry.key).order_by(ChatCacheEntry.last_used_at).limit(overflow)
+            db.query(ChatCacheEntry).filter(ChatCacheEntry.key.in_(oldest)).delete(synchronize_session=False)
+        db.commit()
+
+    def record_bypass(self):
+        with self.lock:
+            self.bypassed += 1
+
+    def stats(self, db: Session) -> dict:
+        with self.lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "entries": db.query(ChatCacheEntry).count(),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else None,
+            }
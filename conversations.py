@@ -0,0 +1,148 @@
+import secrets
+import time
+from sqlalchemy.orm import Session
+from models import Conversation, ConversationTurn
+from retrieval import CHARS_PER_TOKEN
+
+# Prompt tokens given to earlier turns. The newest turns are sent verbatim
+# while they fit; older ones are replaced by a running summary. When the
+# window overflows it is trimmed to HISTORY_TRIM_TO of the budget, so the
+# summary is updated every few turns rather than on every one.
+HISTORY_TOKEN_BUDGET = 1500
+HISTORY_TRIM_TO = 0.5
+# Completion budget for a summary. The default model reasons in a <think>
+# block before answering, which needs most of this on its own.
+SUMMARY_MAX_TOKENS = 2048
+# Conversations idle for longer than this are deleted.
+CONVERSATION_TTL = 7 * 24 * 3600
+
+SUMMARY_PROMPT = (
+    "Summarise this conversation about project management standards in a few sentences, "
+    "keeping the topics, standards and conclusions a follow-up question might refer to."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def turn_messages(turns: list) -> list:
+    """Chat messages for stored turns, oldest first."""
+    messages = []
+    for turn in turns:
+        messages.append({"role": "user", "content": turn.question})
+        messages.append({"role": "assistant", "content": turn.answer})
+    return messages
+
+
+def summary_messages(summary: str, turns: list) -> list:
+    """Prompt that folds the given turns into the existing summary."""
+    previous = f"Summary so far: {summary}\n\n" if summary else ""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in turn_messages(turns))
+    return [
+        {"role": "system", "content": SUMMARY_PROMPT},
+        {"role": "user", "content": previous + transcript},
+    ]
+
+
+class ConversationStore:
+    """
+    Server-side chat history in the conversations and conversation_turns
+    tables. Clients only send a conversation id and the new question; the
+    prompt is rebuilt here from the summary and the turns that fit the budget.
+    """
+
+    def __init__(self, budget: int = HISTORY_TOKEN_BUDGET, trim_to: float = HISTORY_TRIM_TO,
+                 ttl: float = CONVERSATION_TTL):
+        self.budget = budget
+        self.trim_to = trim_to
+        self.ttl = ttl
+
+    def new_id(self) -> str:
+        """Id for a new conversation, which is stored with its first turn (see add_turn)."""
+        return secrets.token_hex(16)
+
+    def get(self, db: Session, conversation_id: str):
+        """The conversation, or None if it does not exist or has expired."""
+        conversation = db.get(Conversation, conversation_id)
+        if conversation is None or conversation.updated_at < time.time() - self.ttl:
+            return None
+        return conversation
+
+    def unsummarized_turns(self, db: Session, conversation: Conversation) -> list:
+        return (
+            db.query(ConversationTurn)
+            .filter(ConversationTurn.conversation_id == conversation.id,
+                    ConversationTurn.id > (conversation.summarized_through or 0))
+            .order_by(ConversationTurn.id)
+            .all()
+        )
+
+    def window(self, db: Session, conversation: Conversation):
+        """
+        Split the turns not yet in the summary into those to send verbatim
+        and those to fold into the summary first.
+
+        Returns:
+            tuple: (turns to summarise, turns to send), both oldest first
+        """
+        turns = self.unsummarized_turns(db, conversation)
+        if sum(turn.tokens for turn in turns) <= self.budget:
+            return [], turns
+        kept = []
+        used = 0
+        for turn in reversed(turns):
+            if used + turn.tokens > self.budget * self.trim_to:
+                break
+            kept.append(turn)
+            used += turn.tokens
+        kept.reverse()
+        return turns[:len(turns) - len(kept)], kept
+
+    def save_summary(self, db: Session, conversation_id: str, summary: str, through: int):
+        """Replace the summary, which now covers the turns up to and including `through`."""
+        db.query(Conversation).filter(Conversation.id == conversation_id).update(
+            {"summary": summary, "summarized_through": through}
+        )
+        db.commit()
+
+    def add_turn(self, db: Session, conversation_id: str, question: str, answer: str):
+        """
+        Append a turn, creating the conversation with its first one, then
+        delete conversations that have expired.
+        """
+        now = time.time()
+        if db.get(Conversation, conversation_id) is None:
+            db.add(Conversation(id=conversation_id, summarized_through=0, created_at=now, updated_at=now))
+            db.flush()
+        db.add(ConversationTurn(
+            conversation_id=conversation_id,
+            question=question,
+            answer=answer,
+            tokens=estimate_tokens(question) + estimate_tokens(answer),
+            created_at=now,
+        ))
+        db.query(Conversation).filter(Conversation.id == conversation_id).update({"updated_at": now})
+        expired = [row.id for row in db.query(Conversation.id).filter(Conversation.updated_at < now - self.ttl)]
+        if expired:
+            self.delete(db, *expired)
+        db.commit()
+
+    def delete(self, db: Session, *conversation_ids: str):
+        db.query(ConversationTurn).filter(ConversationTurn.conversation_id.in_(conversation_ids)).delete()
+        db.query(Conversation).filter(Conversation.id.in_(conversation_ids)).delete()
+        db.commit()
+
+    def to_dict(self, db: Session, conversation: Conversation) -> dict:
+        turns = (
+            db.query(ConversationTurn)
+            .filter(ConversationTurn.conversation_id == conversation.id)
+            .order_by(ConversationTurn.id)
+            .all()
+        )
+        return {
+            "conversation_id": conversation.id,
+            "summary": conversation.summary,
+            "summarized_turns": sum(1 for turn in turns if turn.id <= (conversation.summarized_through or 0)),
+            "turns": [{"question": turn.question, "answer": turn.answer} for turn in turns],
+        }
@@ -1,9 +1,28 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./standards.db"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./standards.db")
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+# SQLite settings for a read-heavy service: WAL lets readers run alongside the
+# ingestion writer, NORMAL sync is safe under WAL, and a bigger page cache plus
+# memory-mapped reads keep hot pages out of the read() path.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # KiB, i.e. ~64 MB per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -0,0 +1,220 @@
+"""
+Local embedding index over sections for semantic search.
+
+Build (offline, re-run after ingesting standards):
+    python embeddings.py            # brute-force index
+    python embeddings.py --ivf 64   # also build an IVF index with 64 lists
+
+Each passage of a section (see passages.py), prefixed with the section
+title, becomes one row of a float32, L2-normalised matrix
+saved as EMBEDDINGS_DIR/vectors.npy, with the row -> section id and
+standard id mappings in section_ids.npy and standard_ids.npy. The matrix is
+memory-mapped at query time and searched with one matrix-vector product; the
+optional IVF index only scans the lists nearest to the query. Queries are encoded by a local model, so no
+network call is made at query time.
+"""
+import json
+import os
+import sys
+import numpy as np
+from sqlalchemy.orm import Session
+from models import Passage
+
+EMBEDDINGS_DIR = "embeddings"
+# sentence-transformers model used to encode chunks and queries; it is
+# downloaded once into the local model cache and then runs on CPU offline.
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = 64
+# Below this many rows a brute-force scan is faster than probing IVF lists.
+IVF_MIN_ROWS = 20_000
+IVF_PROBES = 8
+KMEANS_ITERATIONS = 20
+
+_encoder = None
+_index = None
+
+
+class SentenceTransformerEncoder:
+    """Encodes texts to L2-normalised float32 vectors with a local model."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("Semantic search needs sentence-transformers: pip install sentence-transformers")
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts: list) -> np.ndarray:
+        vectors = self.model.encode(
+            texts, batch_size=ENCODE_BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True,
+        )
+        return vectors.astype(np.float32)
+
+
+def get_encoder():
+    """The process-wide encoder, loaded on first use."""
+    global _encoder
+    if _encoder is None:
+        _encoder = SentenceTransformerEncoder()
+    return _encoder
+
+
+def iter_section_chunks(db: Session):
+    """Yield (section_id, standard_id, chunk text) for every passage, title first."""
+    rows = (
+        db.query(Passage.section_id, Passage.standard_id, Passage.title, Passage.text)
+        .order_by(Passage.section_id, Passage.position)
+        .yield_per(500)
+    )
+    for section_id, standard_id, title, text in rows:
+        if title or text.strip():
+            yield section_id, standard_id, f"{title or ''}\n{text}"
+
+
+def build_embeddings(db: Session, encoder=None, path: str = EMBEDDINGS_DIR, ivf_lists: int = None):
+    """
+    Encode every section chunk and write the vector matrix and row mapping
+    to `path`. Optionally also build an IVF index with ivf_lists lists.
+
+    Returns:
+        int: Number of rows written.
+    """
+    encoder = encoder or get_encoder()
+    batches = []
+    section_ids = []
+    standard_ids = []
+    texts = []
+    for section_id, standard_id, chunk in iter_section_chunks(db):
+        section_ids.append(section_id)
+        standard_ids.append(standard_id)
+        texts.append(chunk)
+        if len(texts) >= ENCODE_BATCH_SIZE:
+            batches.append(encoder.encode(texts))
+            texts = []
+    if texts:
+        batches.append(encoder.encode(texts))
+    if not batches:
+        raise ValueError("No sections to embed.")
+
+    os.makedirs(path, exist_ok=True)
+    vectors = np.concatenate(batches)
+    np.save(os.path.join(path, "vectors.npy"), vectors)
+    np.save(os.path.join(path, "section_ids.npy"), np.asarray(section_ids, dtype=np.int64))
+    np.save(os.path.join(path, "standard_ids.npy"), np.asarray(standard_ids, dtype=np.int64))
+    for name in ("ivf_centroids.npy", "ivf_offsets.npy", "ivf_rows.npy"):
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+    if ivf_lists:
+        build_ivf(vectors, ivf_lists, path)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"model": getattr(encoder, "model_name", None), "rows": len(vectors),
+                   "dim": int(vectors.shape[1]), "ivf_lists": ivf_lists}, f)
+    return len(vectors)
+
+
+def build_ivf(vectors: np.ndarray, n_lists: int, path: str = EMBEDDINGS_DIR, seed: int = 0):
+    """
+    Cluster the vectors with spherical k-means and store the centroids and
+    the rows of each list contiguously (rows sorted by list, plus offsets).
+    """
+    rng = np.random.default_rng(seed)
+    n_lists = min(n_lists, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for i in range(n_lists):
+            members = vectors[assign == i]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[i] = centroid / (np.linalg.norm(centroid) or 1.0)
+    assign = np.argmax(vectors @ centroids.T, axis=1)
+    rows = np.argsort(assign, kind="stable").astype(np.int64)
+    offsets = np.searchsorted(assign[rows], np.arange(n_lists + 1)).astype(np.int64)
+    np.save(os.path.join(path, "ivf_centroids.npy"), centroids.astype(np.float32))
+    np.save(os.path.join(path, "ivf_rows.npy"), rows)
+    np.save(os.path.join(path, "ivf_offsets.npy"), offsets)
+
+
+class SemanticIndex:
+    """Memory-mapped vector matrix with top-k cosine search over sections."""
+
+    def __init__(self, path: str = EMBEDDINGS_DIR):
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.section_ids = np.load(os.path.join(path, "section_ids.npy"))
+        self.standard_ids = np.load(os.path.join(path, "standard_ids.npy"))
+        self.centroids = None
+        if os.path.exists(os.path.join(path, "ivf_centroids.npy")):
+            self.centroids = np.load(os.path.join(path, "ivf_centroids.npy"))
+            self.ivf_rows = np.load(os.path.join(path, "ivf_rows.npy"))
+            self.ivf_offsets = np.load(os.path.join(path, "ivf_offsets.npy"))
+
+    def candidate_rows(self, query: np.ndarray, probes: int, standard_id: int = None):
+        """
+        Rows to score, in row order: those in the IVF lists nearest to the
+        query (or all rows for small or un-clustered indexes), optionally
+        only the rows of one standard. None means every row.
+        """
+        rows = None
+        if self.centroids is not None and len(self.vectors) >= IVF_MIN_ROWS:
+            nearest = np.argsort(self.centroids @ query)[::-1][:probes]
+            rows = np.sort(np.concatenate(
+                [self.ivf_rows[self.ivf_offsets[i]:self.ivf_offsets[i + 1]] for i in nearest]
+            ))
+        if standard_id is not None:
+            in_standard = np.flatnonzero(self.standard_ids == standard_id)
+            rows = in_standard if rows is None else np.intersect1d(rows, in_standard, assume_unique=True)
+        return rows
+
+    def search(self, query: np.ndarray, k: int = 10, standard_id: int = None, probes: int = IVF_PROBES) -> list:
+        """
+        Top-k (section_id, score) pairs for a normalised query vector, best
+        first; a section's score is that of its best-matching chunk.
+        """
+        rows = self.candidate_rows(query, probes, standard_id)
+        if rows is None:
+            scores, ids = self.vectors @ query, self.section_ids
+        else:
+            scores, ids = self.vectors[rows] @ query, self.section_ids[rows]
+        if not len(scores):
+            return []
+        # Over-fetch chunks so that k distinct sections survive de-duplication,
+        # widening the window while one long section's passages crowd it out.
+        top = k * 4
+        while True:
+            top = min(len(scores), top)
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            results = {}
+            for row in best:
+                section_id = int(ids[row])
+                if section_id not in results:
+                    results[section_id] = float(scores[row])
+                    if len(results) == k:
+                        return list(results.items())
+            if top == len(scores):
+                return list(results.items())
+            top *= 4
+
+
+def get_semantic_index(path: str = EMBEDDINGS_DIR):
+    """
+    The process-wide SemanticIndex, reloaded when the index files are
+    rebuilt. Raises FileNotFoundError if no index has been built yet.
+    """
+    global _index
+    meta = os.path.join(path, "meta.json")
+    if not os.path.exists(meta):
+        raise FileNotFoundError("no semantic index built yet, run `python embeddings.py`")
+    mtime = os.path.getmtime(meta)
+    if _index is None or _index[0] != mtime:
+        _index = (mtime, SemanticIndex(path))
+    return _index[1]
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    lists = int(sys.argv[sys.argv.index("--ivf") + 1]) if "--ivf" in sys.argv else None
+    with SessionLocal() as db:
+        rows = build_embeddings(db, ivf_lists=lists)
+    print(f"✅ Embedded {rows} chunks into '{EMBEDDINGS_DIR}/'")
@@ -0,0 +1,103 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from database import SessionLocal
+from parser import parse_standard_pdf
+
+# PDFs are parsed one at a time and later uploads wait in the queue. An
+# ingestion holds SQLite's single write lock from its first insert to its
+# commit, so a second concurrent job would only fail with "database is locked".
+MAX_CONCURRENT_JOBS = 1
+# Finished jobs kept around for GET /jobs/{id} before the oldest are dropped.
+MAX_FINISHED_JOBS = 100
+
+
+class IngestJob:
+    """State and progress of one queued PDF ingestion."""
+
+    def __init__(self, standard_name: str, file_path: str, version: str = None, start_page: int = 0,
+                 workers: int = 1):
+        self.id = uuid.uuid4().hex
+        self.standard_name = standard_name
+        self.file_path = file_path
+        self.version = version
+        self.start_page = start_page
+        self.workers = workers
+        self.status = "queued"
+        self.standard_id = None
+        self.pages_total = None
+        self.pages_extracted = 0
+        self.sections_written = 0
+        self.sections_unchanged = 0
+        self.unchanged = False
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def update(self, **counts):
+        for name, value in counts.items():
+            setattr(self, name, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "standard_name": self.standard_name,
+            "file_path": self.file_path,
+            "status": self.status,
+            "standard_id": self.standard_id,
+            "pages_total": self.pages_total,
+            "pages_extracted": self.pages_extracted,
+            "sections_written": self.sections_written,
+            "sections_unchanged": self.sections_unchanged,
+            "unchanged": self.unchanged,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """In-process ingestion queue backed by a bounded thread pool."""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_JOBS):
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="ingest")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, job: IngestJob) -> IngestJob:
+        with self.lock:
+            self.jobs[job.id] = job
+            self.prune()
+        self.executor.submit(self.run, job)
+        return job
+
+    def get(self, job_id: str):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def run(self, job: IngestJob):
+        job.update(status="running", started_at=time.time())
+        db = SessionLocal()
+        try:
+            standard_id = parse_standard_pdf(
+                job.file_path, db, job.standard_name, job.version, job.start_page,
+                workers=job.workers, progress=job.update,
+            )
+            job.update(status="succeeded", standard_id=standard_id)
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+        finally:
+            db.close()
+            job.update(finished_at=time.time())
+
+    def prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+
+ingest_queue = JobQueue()
@@ -0,0 +1,62 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class Saturated(Exception):
+    """Raised when no upstream slot frees up in time; maps to 429 + Retry-After."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many concurrent requests, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of concurrent upstream calls. Callers beyond the cap
+    queue for a slot for up to queue_timeout seconds; at most max_queued may
+    wait at once, anyone else is turned away immediately.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, queue_timeout: float, retry_after: int):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        if self.semaphore.locked() and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise Saturated(self.retry_after)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Saturated(self.retry_after)
+        finally:
+            self.queued -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
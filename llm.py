@@ -0,0 +1,123 @@
+"""
+Chat completion providers, selected with the LLM_PROVIDER environment variable:
+
+    groq  the hosted model (default)
+    fake  a deterministic local stand-in with configurable latency and token
+          rate, for tests and load tests without network access
+"""
+import asyncio
+import hashlib
+import os
+import httpx
+
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "groq")
+LLM_MODEL = os.environ.get("LLM_MODEL", "deepseek-r1-distill-llama-70B")
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
+
+# Fake provider: seconds before the first token, tokens per second after it,
+# and answer length in tokens.
+FAKE_LLM_LATENCY = float(os.environ.get("FAKE_LLM_LATENCY", 0.2))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", 200))
+FAKE_LLM_TOKENS = int(os.environ.get("FAKE_LLM_TOKENS", 120))
+
+FAKE_VOCABULARY = (
+    "project risk stakeholder scope quality schedule value benefit team plan stage "
+    "governance change control tailoring delivery progress issue business case"
+).split()
+
+
+class ProviderNotConfigured(RuntimeError):
+    """The selected provider is missing its credentials or settings."""
+
+
+class ChatProvider:
+    """A chat completion backend: the whole answer at once, or streamed in pieces."""
+
+    async def complete(self, messages: list, temperature: float, max_tokens: int) -> str:
+        raise NotImplementedError
+
+    def stream(self, messages: list, temperature: float, max_tokens: int):
+        """Async iterator over pieces of the answer text."""
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class GroqProvider(ChatProvider):
+    """Groq API over one pooled async HTTP client."""
+
+    def __init__(self, model: str = LLM_MODEL, api_key: str = GROQ_API_KEY, max_connections: int = 8,
+                 timeout: float = 120):
+        if not api_key:
+            raise ProviderNotConfigured("GROQ_API_KEY is not set; set it, or use LLM_PROVIDER=fake to run without the hosted model.")
+        from groq import AsyncGroq
+        self.model = model
+        self.client = AsyncGroq(
+            api_key=api_key,
+            timeout=timeout,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                timeout=timeout,
+            ),
+        )
+
+    async def complete(self, messages, temperature, max_tokens):
+        completion = await self.client.chat.completions.create(
+            model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens,
+        )
+        return completion.choices[0].message.content
+
+    async def stream(self, messages, temperature, max_tokens):
+        stream = await self.client.chat.completions.create(
+            model=self.model, messages=messages, temperature=temperature, max_tokens=max_tokens, stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self):
+        await self.client.close()
+
+
+class FakeProvider(ChatProvider):
+    """
+    Deterministic local model: the same messages always produce the same
+    answer, preceded by a short <think> block like the real model's. Waits
+    `latency` seconds, then produces `tokens_per_second` tokens per second.
+    """
+
+    def __init__(self, latency: float = FAKE_LLM_LATENCY, tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND,
+                 answer_tokens: int = FAKE_LLM_TOKENS):
+        self.model = "fake"
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+
+    def tokens(self, messages: list, max_tokens: int) -> list:
+        seed = hashlib.sha256(messages[-1]["content"].encode("utf-8")).digest()
+        words = [FAKE_VOCABULARY[seed[i % len(seed)] % len(FAKE_VOCABULARY)] for i in range(self.answer_tokens)]
+        return (["<think>", "fake ", "reasoning", "</think>", "\n\n"] + [word + " " for word in words])[:max_tokens]
+
+    async def complete(self, messages, temperature, max_tokens):
+        tokens = self.tokens(messages, max_tokens)
+        await asyncio.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        return "".join(tokens)
+
+    async def stream(self, messages, temperature, max_tokens):
+        await asyncio.sleep(self.latency)
+        for token in self.tokens(messages, max_tokens):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield token
+
+
+def get_provider(name: str = LLM_PROVIDER, max_connections: int = 8, timeout: float = 120) -> ChatProvider:
+    """
+    The provider configured by name ("groq" or "fake"). Connection pool size
+    and timeout apply to providers that make network calls.
+    """
+    if name == "groq":
+        return GroqProvider(max_connections=max_connections, timeout=timeout)
+    if name == "fake":
+        return FakeProvider()
+    raise ValueError(f"Unknown LLM provider '{name}'.")
@@ -0,0 +1,108 @@
+"""
+Load test for the chat path, runnable without network access.
+
+By default the backend runs in-process (no server, no sockets) with the fake
+LLM provider, so the numbers are our own overhead: retrieval, caching,
+queueing behind the concurrency limit, <think> filtering and streaming.
+The in-process transport buffers response bodies, so time to first token
+is only meaningful against a running server (--url).
+
+    python load_test.py --users 50 --chats 4 --stream
+    python load_test.py --url http://127.0.0.1:8000   # a running server
+
+Fake provider timing is set with FAKE_LLM_LATENCY, FAKE_LLM_TOKENS_PER_SECOND
+and FAKE_LLM_TOKENS; limits with MAX_CONCURRENT_CHATS etc. (see backend.py).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import httpx
+
+SEARCH_TERMS = ["risk", "stakeholder", "quality", "governance", "benefits"]
+
+
+def percentiles(values: list) -> str:
+    if not values:
+        return "n/a"
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(p * len(values)))]
+    return (f"p50 {pick(0.50) * 1000:7.1f} ms  p95 {pick(0.95) * 1000:7.1f} ms  "
+            f"p99 {pick(0.99) * 1000:7.1f} ms  max {values[-1] * 1000:7.1f} ms  (n={len(values)})")
+
+
+async def chat_user(client: httpx.AsyncClient, user: int, chats: int, stream: bool, results: dict):
+    for i in range(chats):
+        # Distinct questions with the cache bypassed, so every chat goes upstream.
+        body = {"question": f"How is risk managed across project stages? (user {user}, question {i})"}
+        headers = {"Cache-Control": "no-cache"}
+        start = time.perf_counter()
+        if stream:
+            async with client.stream("POST", "/chat/stream", json=body, headers=headers) as response:
+                first = None
+                async for line in response.aiter_lines():
+                    if first is None and line.startswith("data: "):
+                        first = time.perf_counter() - start
+                status = response.status_code
+            if first is not None and status == 200:
+                results["first_token"].append(first)
+        else:
+            status = (await client.post("/chat", json=body, headers=headers)).status_code
+        elapsed = time.perf_counter() - start
+        if status == 200:
+            results["chat"].append(elapsed)
+        elif status == 429:
+            results["rejected"] += 1
+        else:
+            results["errors"] += 1
+
+
+async def search_user(client: httpx.AsyncClient, standard: str, until: asyncio.Event, results: dict):
+    i = 0
+    while not until.is_set():
+        start = time.perf_counter()
+        params = {"q": SEARCH_TERMS[i % len(SEARCH_TERMS)], "standard_name": standard, "count_only": True}
+        await client.get("/search", params=params)
+        results["search"].append(time.perf_counter() - start)
+        i += 1
+        await asyncio.sleep(0.01)
+
+
+async def run(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=None)
+    else:
+        os.environ.setdefault("LLM_PROVIDER", "fake")
+        import backend
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=backend.app), base_url="http://load-test",
+                                   timeout=None)
+    results = {"chat": [], "first_token": [], "search": [], "rejected": 0, "errors": 0}
+    async with client:
+        standard = (await client.get("/standards")).json()[0]["name"]
+        done = asyncio.Event()
+        searchers = [asyncio.create_task(search_user(client, standard, done, results)) for _ in range(args.searchers)]
+        start = time.perf_counter()
+        await asyncio.gather(*(chat_user(client, u, args.chats, args.stream, results) for u in range(args.users)))
+        wall = time.perf_counter() - start
+        done.set()
+        await asyncio.gather(*searchers)
+
+    print(f"{args.users} users x {args.chats} chats ({'stream' if args.stream else 'complete'}) in {wall:.2f}s")
+    print(f"  chat         {percentiles(results['chat'])}")
+    if args.stream:
+        print(f"  first token  {percentiles(results['first_token'])}")
+    print(f"  search       {percentiles(results['search'])}")
+    print(f"  429s {results['rejected']}  errors {results['errors']}  "
+          f"chat throughput {len(results['chat']) / wall:.1f}/s  "
+          f"mean search {statistics.mean(results['search']) * 1000 if results['search'] else 0:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50, help="concurrent chat users")
+    parser.add_argument("--chats", type=int, default=2, help="chats per user")
+    parser.add_argument("--searchers", type=int, default=2, help="concurrent /search clients during the test")
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream and report time to first token")
+    parser.add_argument("--url", help="test a running server instead of the in-process app")
+    asyncio.run(run(parser.parse_args()))
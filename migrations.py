@@ -0,0 +1,79 @@
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import Session
+from database import Base
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from search_index import ensure_search_index
+from section_tree import ensure_section_tree
+from passages import ensure_passages
+from topic_coverage import ensure_coverage, refresh_coverage
+
+# Columns added after the first release, by table. SQLite can add nullable
+# columns in place, so existing databases are upgraded with ALTER TABLE.
+ADDED_COLUMNS = {
+    "standards": {
+        "content_hash": "VARCHAR",
+        "page_hashes": "TEXT",
+        "revision": "INTEGER",
+    },
+    "sections": {
+        "first_page": "INTEGER",
+        "last_page": "INTEGER",
+        "position": "INTEGER",
+        "parent_id": "INTEGER",
+        "depth": "INTEGER",
+        "path": "VARCHAR",
+    },
+}
+
+
+def upgrade_schema(db: Session):
+    """
+    Bring the database up to the current schema. Safe to run on every start:
+    creates missing tables, adds missing columns and indexes, the search
+    index, passages, the section tree and any topic coverage not computed
+    yet (or computed before the standard had passages).
+    """
+    Base.metadata.create_all(bind=db.get_bind())
+    for table, columns in ADDED_COLUMNS.items():
+        existing = {row[1] for row in db.execute(text(f"PRAGMA table_info({table})"))}
+        for name, ddl_type in columns.items():
+            if name not in existing:
+                db.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+    db.commit()
+    create_indexes(db)
+    ensure_search_index(db)
+    passages_built = ensure_passages(db)
+    ensure_section_tree(db)
+    if passages_built:
+        refresh_coverage(db, sorted(passages_built))
+    ensure_coverage(db)
+
+
+def create_indexes(db: Session):
+    """
+    Create the indexes declared on the models that an older database lacks
+    (create_all only adds indexes together with new tables).
+    """
+    # Superseded by ix_standards_name_coalesced_version, which also covers NULL versions.
+    db.execute(text("DROP INDEX IF EXISTS ix_standards_name_version"))
+    db.commit()
+    if find_duplicate_standards(db):
+        print("⚠️ Duplicate (name, version) standards found; skipping ix_standards_name_coalesced_version.")
+        skip = {"ix_standards_name_coalesced_version"}
+    else:
+        skip = set()
+    # IF NOT EXISTS rather than checkfirst: reflection can't see expression
+    # indexes, so checkfirst would try to create those again.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in skip:
+                db.execute(CreateIndex(index, if_not_exists=True))
+    db.commit()
+
+
+def find_duplicate_standards(db: Session) -> list:
+    """(name, version) pairs stored more than once, a missing version included, which block the unique index."""
+    return db.execute(text(
+        "SELECT name, version FROM standards GROUP BY name, coalesce(version, '') HAVING count(*) > 1"
+    )).fetchall()
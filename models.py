@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index, Float, LargeBinary, func
+from sqlalchemy.orm import relationship, deferred
 from database import Base
 
 class Standard(Base):
@@ -8,15 +8,86 @@ class Standard(Base):
     name = Column(String, nullable=False)
     version = Column(String)
     file_path = Column(String)
+    content_hash = Column(String)  # sha256 of the PDF file
+    page_hashes = deferred(Column(Text))  # JSON list of per-page text hashes, by page number
+    revision = Column(Integer, default=0)  # bumped each time ingestion writes the standard
 
     sections = relationship("Section", back_populates="standard")
 
+# One standard per (name, version). SQLite treats NULLs as distinct in unique
+# indexes, so a missing version is indexed as '' to cover it too.
+Index("ix_standards_name_coalesced_version", Standard.name, func.coalesce(Standard.version, ""), unique=True)
+
 class Section(Base):
     __tablename__ = "sections"
+    __table_args__ = (
+        # Also serves lookups by standard_id alone (leftmost prefix).
+        Index("ix_sections_standard_id_section_number", "standard_id", "section_number"),
+        # Subtrees and the table of contents are ranges of this index.
+        Index("ix_sections_standard_id_path", "standard_id", "path"),
+        Index("ix_sections_standard_id_depth", "standard_id", "depth"),
+    )
     id = Column(Integer, primary_key=True)
     standard_id = Column(Integer, ForeignKey("standards.id"))
     section_number = Column(String)
     title = Column(String)
     content = Column(Text)
+    first_page = Column(Integer)
+    last_page = Column(Integer)
+    position = Column(Integer)  # order within the standard's document
+    parent_id = Column(Integer, ForeignKey("sections.id"))
+    depth = Column(Integer)  # 0 for top-level sections
+    path = Column(String)  # materialised path of positions, see section_tree.py
 
     standard = relationship("Standard", back_populates="sections")
+
+class Passage(Base):
+    __tablename__ = "passages"
+    __table_args__ = (
+        Index("ix_passages_section_id_position", "section_id", "position"),
+        Index("ix_passages_standard_id", "standard_id"),
+    )
+    id = Column(Integer, primary_key=True)
+    section_id = Column(Integer, ForeignKey("sections.id"), nullable=False)
+    standard_id = Column(Integer, ForeignKey("standards.id"))
+    position = Column(Integer)  # order within the section
+    start_char = Column(Integer)  # offsets of text in the section's content
+    end_char = Column(Integer)
+    title = Column(String)  # the section's title, searchable with every passage
+    text = Column(Text)
+
+class ChatCacheEntry(Base):
+    __tablename__ = "chat_cache"
+    key = Column(String, primary_key=True)  # normalised question
+    question = Column(Text)
+    answer = Column(Text)
+    citations = Column(Text)  # JSON list
+    embedding = Column(LargeBinary)  # float32 question vector, for near-duplicate lookups
+    created_at = Column(Float, nullable=False)
+    last_used_at = Column(Float, nullable=False, index=True)
+    hits = Column(Integer, default=0)
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+    id = Column(String, primary_key=True)  # random hex id handed to the client
+    summary = Column(Text)  # model-written summary of the turns up to summarized_through
+    summarized_through = Column(Integer, default=0)  # id of the last turn folded into the summary
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)
+
+class ConversationTurn(Base):
+    __tablename__ = "conversation_turns"
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False, index=True)
+    question = Column(Text)
+    answer = Column(Text)
+    tokens = Column(Integer)  # estimated prompt tokens of question + answer
+    created_at = Column(Float, nullable=False)
+
+class TopicCoverage(Base):
+    __tablename__ = "topic_coverage"
+    topic = Column(String, primary_key=True)
+    standard_id = Column(Integer, ForeignKey("standards.id"), primary_key=True)
+    count = Column(Integer, nullable=False)  # matching sections
+    section_ids = Column(Text)  # JSON list, most relevant first
+    score = Column(Float, nullable=False)  # summed relevance of the matches, higher is better
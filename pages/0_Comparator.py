@@ -1,6 +1,6 @@
 import streamlit as st
-import requests
 import pandas as pd
+from api_client import RevalidatingSession
 
 # ==============================
 # CONFIG
@@ -72,13 +72,22 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# ==============================
+# HTTP SESSION
+# ==============================
+@st.cache_resource
+def get_http_session():
+    """One pooled, revalidating session for all backend calls, shared across reruns."""
+    return RevalidatingSession()
+
 # ==============================
 # FETCH STANDARDS DYNAMICALLY
 # ==============================
-@st.cache_data
+# Revalidated on every run (a 304 while nothing changed), so newly parsed
+# standards show up without restarting the app.
 def get_standards():
     try:
-        response = requests.get(f"{BACKEND_URL}/standards")
+        response = get_http_session().get(f"{BACKEND_URL}/standards")
         if response.status_code == 200:
             data = response.json()
             return [item["name"] for item in data]
@@ -123,19 +132,25 @@ def create_result_card(title, content, standard_name, result_number):
 # ==============================
 # SEARCH FUNCTION
 # ==============================
-def search_standard(standard_name, query):
+def search_standards(standard_names, query):
+    """Search all selected standards in one /search/multi call; returns a DataFrame per standard."""
     try:
-        response = requests.get(f"{BACKEND_URL}/search", params={"q": query, "standard_name": standard_name})
-        if response.status_code == 200:
-            data = response.json()
-            if isinstance(data, list) and data:
-                return pd.DataFrame(data)
-            else:
-                return pd.DataFrame([{"title": "No results found", "content": f"No matches for '{query}' in {standard_name}"}])
-        else:
-            return pd.DataFrame([{"title": "Search Error", "content": f"API returned status {response.status_code}"}])
+        response = get_http_session().get(
+            f"{BACKEND_URL}/search/multi",
+            params={"q": query, "standards": ",".join(standard_names), "fields": "id,section_number,title", "snippet": 32},
+        )
+        if response.status_code != 200:
+            error = pd.DataFrame([{"title": "Search Error", "content": f"API returned status {response.status_code}"}])
+            return {name: error for name in standard_names}
+        grouped = response.json()["results"]
+        return {
+            name: pd.DataFrame(grouped[name]) if grouped.get(name)
+            else pd.DataFrame([{"title": "No results found", "content": f"No matches for '{query}' in {name}"}])
+            for name in standard_names
+        }
     except Exception as e:
-        return pd.DataFrame([{"title": "Connection Error", "content": f"Could not connect to backend: {str(e)}"}])
+        error = pd.DataFrame([{"title": "Connection Error", "content": f"Could not connect to backend: {str(e)}"}])
+        return {name: error for name in standard_names}
 
 # ==============================
 # STREAMLIT UI
@@ -214,12 +229,12 @@ else:
             cols = st.columns(len(standards))
             
             # Store all results for summary
-            all_results = {}
+            all_results = search_standards(standards, search_query)
             
             for i, standard in enumerate(standards):
                 with cols[i]:
                     # Standard Header with Count
-                    results_df = search_standard(standard, search_query)
+                    results_df = all_results[standard]
                     result_count = len(results_df) if not results_df.empty else 0
                     
                     st.markdown(f"""
@@ -231,8 +246,6 @@ else:
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    all_results[standard] = results_df
-                    
                     # Display Results
                     if results_df.empty:
                         st.markdown("""
@@ -244,7 +257,7 @@ else:
                     else:
                         for idx, row in results_df.iterrows():
                             title = row.get("title", "Content Section")
-                            content = row.get("content", "No content available")
+                            content = row.get("snippet", row.get("content", "No content available"))
                             
                             result_card = create_result_card(
                                 title, 
@@ -1,5 +1,5 @@
 import streamlit as st
-import requests
+from api_client import RevalidatingSession
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -91,30 +91,16 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Updated topics list from previous response
-PROJECT_MANAGEMENT_TOPICS = [
-    # PMBOK 7th Edition: Project Performance Domains 
-    "Stakeholders", "Team", "Development Approach and Life Cycle", "Planning",
-    "Project Work", "Delivery", "Measurement", "Uncertainty",
-    # PMBOK 7th Edition: Core Principles & Concepts 
-    "Stewardship", "Value Delivery", "Tailoring", "Models, Methods, and Artifacts",
-    # PRINCE2 7th Edition: Practices (formerly Themes) 
-    "Business Case", "Organizing", "Quality", "Risk", "Issues", "Progress",
-    # PRINCE2 7th Edition: Processes 
-    "Starting up a Project", "Directing a Project", "Initiating a Project",
-    "Controlling a Stage", "Managing Product Delivery", "Managing a Stage Boundary", "Closing a Project",
-    # PRINCE2 7th Edition: Principles 
-    "Continued Business Justification", "Learn from Experience", "Defined Roles and Responsibilities",
-    "Manage by Stages", "Manage by Exception", "Focus on Products", "Tailor to Suit the Project Environment",
-    # Common & Cross-Cutting Topics
-    "Change Control", "Agile Practices", "Project Governance", "Lessons Learned",
-    "Benefits Management", "Sustainability"
-]
+@st.cache_resource
+def get_http_session():
+    """One pooled, revalidating session for all backend calls, shared across reruns."""
+    return RevalidatingSession()
 
-@st.cache_data
+# Revalidated on every run (a 304 while nothing changed), so newly parsed
+# standards show up without restarting the app.
 def get_standards():
     try:
-        response = requests.get(f"{BACKEND_URL}/standards")
+        response = get_http_session().get(f"{BACKEND_URL}/standards")
         if response.status_code == 200:
             data = response.json()
             return [item["name"] for item in data]
@@ -361,22 +347,19 @@ else:
         else:
             # Data collection
             with st.spinner("🔄 Analyzing standards coverage..."):
+                # The topic list and its coverage are kept by the backend and
+                # precomputed when standards are ingested.
                 coverage_data = []
-                progress_bar = st.progress(0)
-                total_topics = len(PROJECT_MANAGEMENT_TOPICS)
-                
-                for idx, topic in enumerate(PROJECT_MANAGEMENT_TOPICS):
-                    row = {"Topic": topic}
-                    for std in standards:
-                        res = requests.get(f"{BACKEND_URL}/search", params={"q": topic, "standard_name": std})
-                        if res.status_code == 200:
-                            data = res.json()
-                            count = len(data) if isinstance(data, list) else 0
-                            row[std] = count
-                        else:
-                            row[std] = 0
-                    coverage_data.append(row)
-                    progress_bar.progress((idx + 1) / total_topics)
+                res = get_http_session().get(f"{BACKEND_URL}/coverage", params={"standards": ",".join(standards)})
+                if res.status_code == 200:
+                    matrix = res.json()
+                    for topic, counts in zip(matrix["topics"], matrix["counts"]):
+                        row = {"Topic": topic}
+                        row.update(zip(matrix["standards"], counts))
+                        coverage_data.append(row)
+                else:
+                    st.error(f"Failed to analyze coverage: {res.text}")
+                    st.stop()
 
             df = pd.DataFrame(coverage_data)
             
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import pandas as pd
 import time
 
@@ -176,6 +177,11 @@ if "chat_history" not in st.session_state:
 if "suggestions_used" not in st.session_state:
     st.session_state.suggestions_used = set()
 
+# Server-side conversation the questions belong to; the backend keeps the
+# history, so each request only carries the new question.
+if "conversation_id" not in st.session_state:
+    st.session_state.conversation_id = None
+
 # ==============================
 # HELPER FUNCTIONS
 # ==============================
@@ -189,17 +195,57 @@ def add_message(role, content):
         "time": get_current_time()
     })
 
+def format_sources(citations):
+    if not citations:
+        return ""
+    sources = ", ".join(f"{c['standard']} {c['section_number']} {c['title']}" for c in citations)
+    return f"<br><br><small>📚 <b>Sources:</b> {sources}</small>"
+
+def render_bot_message(placeholder, content):
+    placeholder.markdown(f"""
+    <div class="bot-message">
+        <div style="font-weight: bold; margin-bottom: 0.5rem;">🤖 PM ASSISTANT</div>
+        <div>{content}</div>
+        <div class="message-time">{get_current_time()}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
 def send_chat_request(question):
+    """Stream the answer from /chat/stream, showing it as it arrives."""
+    placeholder = st.empty()
+    answer = ""
     try:
         with st.spinner("🤔 Thinking..."):
-            res = requests.post(f"{BACKEND_URL}/chat", json={"question": question})
-            if res.status_code == 200:
-                answer = res.json().get("answer", "No answer received.")
-                return answer
-            else:
+            payload = {"question": question, "conversation_id": st.session_state.conversation_id}
+            res = requests.post(f"{BACKEND_URL}/chat/stream", json=payload, stream=True)
+            if res.status_code == 404:
+                # The conversation expired on the server: start a new one.
+                st.session_state.conversation_id = None
+                payload["conversation_id"] = None
+                res = requests.post(f"{BACKEND_URL}/chat/stream", json=payload, stream=True)
+            if res.status_code != 200:
                 return f"❌ Error: {res.text}"
+            event = None
+            for line in res.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "done":
+                        st.session_state.conversation_id = data.get("conversation_id")
+                        answer = answer.strip() + format_sources(data.get("citations"))
+                    elif event == "error":
+                        return f"❌ Error: {data.get('detail')}"
+                    else:
+                        answer += data.get("delta", "")
+                        render_bot_message(placeholder, answer + " ▌")
+                elif not line:
+                    event = None
+        return answer.strip() or "No answer received."
     except Exception as e:
         return f"❌ Failed to connect to server: {str(e)}"
+    finally:
+        placeholder.empty()
 
 # ==============================
 # STREAMLIT UI
@@ -322,8 +368,14 @@ st.markdown('</div>', unsafe_allow_html=True)
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
     if st.button("🗑️ Clear Conversation", use_container_width=True):
+        if st.session_state.conversation_id:
+            try:
+                requests.delete(f"{BACKEND_URL}/conversations/{st.session_state.conversation_id}")
+            except requests.RequestException:
+                pass
         st.session_state.chat_history = []
         st.session_state.suggestions_used = set()
+        st.session_state.conversation_id = None
         st.rerun()
 
 # Footer
@@ -1,69 +1,280 @@
 import fitz  
+import hashlib
+import json
+import multiprocessing
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from models import Standard, Section
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from migrations import upgrade_schema
+from topic_coverage import refresh_coverage
+from section_tree import build_section_tree
+from passages import build_passages
+from chat_cache import clear_chat_cache
+from query_cache import search_cache, corpus_version
 
 SECTION_PATTERN = re.compile(r"^\d+(\.\d+)*\s+.+")  
 
-def parse_standard_pdf(file_path: str, db: Session, standard_name: str, version: str = None, start_page: int = 0):
+# Sections are written in batches of this many rows as they complete.
+SECTION_BATCH_SIZE = 500
+# A section whose text grows past this many characters (usually a missed
+# heading) is split into consecutive records with the same number and title.
+MAX_SECTION_CHARS = 200_000
+# Pages handed to a worker process at a time when extracting in parallel.
+PAGES_PER_TASK = 16
+
+def iter_page_text(doc, start_page: int = 0):
+    """Yield the text of each page from start_page on, one page at a time."""
+    for page_num in range(start_page, len(doc)):
+        yield doc[page_num].get_text("text")
+
+def extract_page_range(file_path: str, first_page: int, last_page: int) -> list:
+    """Text of pages first_page..last_page-1; runs in a worker process with its own document."""
+    doc = fitz.open(file_path)
+    try:
+        return [doc[page_num].get_text("text") for page_num in range(first_page, last_page)]
+    finally:
+        doc.close()
+
+def iter_page_text_parallel(file_path: str, start_page: int, total_pages: int, workers: int,
+                            pages_per_task: int = PAGES_PER_TASK):
+    """
+    Yield page texts in page order, extracted by a pool of `workers` processes.
+    The page range is split into tasks of pages_per_task pages; at most two
+    tasks per worker are in flight so finished text doesn't pile up in memory.
+    Workers are spawned rather than forked: this runs on an ingest thread of
+    a multi-threaded server, and a forked child could inherit locks held by
+    other threads.
+    """
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        in_flight = deque()
+        for first_page in range(start_page, total_pages, pages_per_task):
+            last_page = min(first_page + pages_per_task, total_pages)
+            in_flight.append(pool.submit(extract_page_range, file_path, first_page, last_page))
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+def file_hash(file_path: str) -> str:
+    """sha256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def text_hash(text: str) -> str:
+    """Short hash of one page's extracted text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def iter_numbered_pages(pages, start_page: int, page_hashes: dict, progress):
+    """
+    Pair page texts with their page numbers, recording each page's text hash
+    in page_hashes and reporting the running count to `progress`.
+    """
+    for count, text in enumerate(pages, 1):
+        page_num = start_page + count - 1
+        page_hashes[page_num] = text_hash(text)
+        yield page_num, text
+        progress(pages_extracted=count)
+
+def iter_lines(pages):
+    """
+    Yield (page_num, stripped line) across (page_num, text) pairs. A line
+    that is not terminated at the end of a page continues on the next one.
+    """
+    partial = ""
+    page_num = None
+    for page_num, text in pages:
+        lines = (partial + text).split("\n")
+        partial = lines.pop()
+        for line in lines:
+            yield page_num, line.strip()
+    yield page_num, partial.strip()
+
+def iter_sections(lines, max_section_chars: int = MAX_SECTION_CHARS):
+    """
+    Group (page_num, line) pairs into (heading, body_lines, first_page,
+    last_page) at each SECTION_PATTERN heading. Text before the first
+    heading is carried into the first section; at most max_section_chars
+    of body text is held at once.
+    """
+    heading = None
+    body = []
+    size = 0
+    first_page = last_page = None
+    continued = False
+    for page_num, line in lines:
+        if first_page is None:
+            first_page = page_num
+        if SECTION_PATTERN.match(line):
+            if heading and (body or not continued):
+                yield heading, body, first_page, last_page
+            if heading:
+                body = []
+                size = 0
+                first_page = page_num
+            last_page = page_num
+            heading = line
+            continued = False
+            continue
+        body.append(line)
+        last_page = page_num
+        size += len(line) + 1
+        if size > max_section_chars:
+            if heading:
+                yield heading, body, first_page, last_page
+                continued = True
+            # Front matter this long before any heading is dropped.
+            body = []
+            size = 0
+            first_page = None
+    if heading and (body or not continued):
+        yield heading, body, first_page, last_page
+
+def section_record(standard_id: int, heading: str, lines: list, first_page: int, last_page: int) -> dict:
+    """Column values for one section, from its heading line and body lines."""
+    return {
+        "standard_id": standard_id,
+        "section_number": heading.split(" ")[0],
+        "title": " ".join(heading.split(" ")[1:]),
+        "content": "\n".join(lines),
+        "first_page": first_page,
+        "last_page": last_page,
+    }
+
+def find_standard(db: Session, standard_name: str, version: str = None):
+    version_filter = Standard.version == version if version is not None else Standard.version.is_(None)
+    return db.query(Standard).filter(Standard.name == standard_name, version_filter).order_by(Standard.id).first()
+
+def parse_standard_pdf(file_path: str, db: Session, standard_name: str, version: str = None, start_page: int = 0,
+                       chunk_size: int = SECTION_BATCH_SIZE, max_section_chars: int = MAX_SECTION_CHARS,
+                       workers: int = 1, progress=None):
     """
     Parse a standard PDF file starting from a specific page number.
 
+    Pages are streamed through a pages -> lines -> sections pipeline and
+    sections are inserted in batches as they complete, so memory stays flat
+    regardless of page count. Everything is written in a single transaction;
+    if parsing fails partway nothing is kept.
+
+    Re-parsing a standard (same name and version) updates it in place: an
+    unchanged file is a no-op, and for a revised file only sections whose
+    pages changed are rewritten.
+
     Args:
         file_path (str): Path to the PDF file.
         db (Session): SQLAlchemy database session.
         standard_name (str): Name of the standard.
         version (str, optional): Version or edition of the standard.
         start_page (int, optional): Page number to start parsing from (0-indexed).
+        chunk_size (int, optional): Number of sections inserted per batch.
+        max_section_chars (int, optional): Largest section body kept in memory;
+            longer sections are split into consecutive records.
+        workers (int, optional): Number of processes extracting page text in
+            parallel; 1 extracts in this process.
+        progress (callable, optional): Called with keyword counts as parsing
+            advances: pages_total, pages_extracted, sections_written,
+            sections_unchanged, and unchanged=True when nothing needed doing.
+
+    Returns:
+        int: Id of the Standard row.
     """
+    progress = progress or (lambda **counts: None)
+    # Creates any missing tables/columns and the full-text index, which
+    # triggers keep in sync with the sections written below.
+    upgrade_schema(db)
+
+    digest = file_hash(file_path)
+    standard = find_standard(db, standard_name, version)
+    old_hashes = json.loads(standard.page_hashes) if standard and standard.page_hashes else []
+    old_start = next((page for page, value in enumerate(old_hashes) if value is not None), None)
+    if standard and standard.content_hash == digest and old_start == start_page:
+        progress(unchanged=True)
+        print(f"✅ '{standard_name}' is unchanged, nothing to parse")
+        return standard.id
+
     doc = fitz.open(file_path)
-    total_pages = len(doc)
-
-    if start_page >= total_pages:
-        raise ValueError(f"start_page {start_page} is beyond the total number of pages ({total_pages}).")
-
-    all_text = ""
-    for page_num in range(start_page, total_pages):
-        page = doc[page_num]
-        all_text += page.get_text("text")
-
-    
-    lines = all_text.split("\n")
-    current_section = None
-    current_text = []
-
-    
-    standard = Standard(name=standard_name, version=version, file_path=file_path)
-    db.add(standard)
-    db.commit()
-
-    for line in lines:
-        stripped = line.strip()
-        if SECTION_PATTERN.match(stripped):
-            
-            if current_section:
-                section = Section(
-                    standard_id=standard.id,
-                    section_number=current_section.split(" ")[0],
-                    title=" ".join(current_section.split(" ")[1:]),
-                    content="\n".join(current_text),
-                )
-                db.add(section)
-                db.commit()
-                current_text = []
-            current_section = stripped
+    try:
+        total_pages = len(doc)
+
+        if start_page >= total_pages:
+            raise ValueError(f"start_page {start_page} is beyond the total number of pages ({total_pages}).")
+
+        # Existing sections by (first_page, last_page, number, title); any left
+        # over once the new sections are matched against them are stale.
+        existing = {}
+        if standard:
+            rows = db.query(
+                Section.id, Section.first_page, Section.last_page, Section.section_number, Section.title,
+            ).filter(Section.standard_id == standard.id)
+            for row in rows:
+                existing.setdefault(tuple(row[1:]), []).append(row.id)
+        else:
+            standard = Standard(name=standard_name, version=version)
+            db.add(standard)
+            db.flush()
+
+        progress(pages_total=total_pages - start_page)
+        if workers > 1:
+            pages = iter_page_text_parallel(file_path, start_page, total_pages, workers)
         else:
-            current_text.append(stripped)
-
-    
-    if current_section:
-        section = Section(
-            standard_id=standard.id,
-            section_number=current_section.split(" ")[0],
-            title=" ".join(current_section.split(" ")[1:]),
-            content="\n".join(current_text),
-        )
-        db.add(section)
+            pages = iter_page_text(doc, start_page)
+        page_hashes = {}
+        pages = iter_numbered_pages(pages, start_page, page_hashes, progress)
+        sections = iter_sections(iter_lines(pages), max_section_chars)
+        pending = []
+        positions = {}  # document order of the unchanged sections
+        written = 0
+        unchanged = 0
+        for position, (heading, body, first_page, last_page) in enumerate(sections):
+            record = section_record(standard.id, heading, body, first_page, last_page)
+            record["position"] = position
+            key = (first_page, last_page, record["section_number"], record["title"])
+            pages_same = all(
+                page < len(old_hashes) and old_hashes[page] == page_hashes[page]
+                for page in range(first_page, last_page + 1)
+            )
+            if pages_same and existing.get(key):
+                positions[existing[key].pop(0)] = position
+                unchanged += 1
+                progress(sections_unchanged=unchanged)
+                continue
+            pending.append(record)
+            if len(pending) >= chunk_size:
+                db.execute(insert(Section), pending)
+                written += len(pending)
+                progress(sections_written=written)
+                pending = []
+        if pending:
+            db.execute(insert(Section), pending)
+            written += len(pending)
+            progress(sections_written=written)
+
+        stale = [section_id for ids in existing.values() for section_id in ids]
+        for i in range(0, len(stale), chunk_size):
+            db.query(Section).filter(Section.id.in_(stale[i:i + chunk_size])).delete(synchronize_session=False)
+
+        build_section_tree(db, standard.id, positions)
+        build_passages(db, standard.id)
+
+        standard.file_path = file_path
+        standard.content_hash = digest
+        standard.page_hashes = json.dumps([page_hashes.get(page) for page in range(total_pages)])
+        standard.revision = (standard.revision or 0) + 1
+        refresh_coverage(db, [standard.id])
+        clear_chat_cache(db)
         db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        doc.close()
+    search_cache.invalidate(standard_name)
+    corpus_version.invalidate()
 
     print(f"✅ Parsed and stored '{standard_name}' starting from page {start_page + 1}")
+    return standard.id
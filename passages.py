@@ -0,0 +1,96 @@
+from sqlalchemy import insert, text, exists
+from sqlalchemy.orm import Session
+from models import Section, Passage
+
+# Sections are searched and quoted in passages of at most PASSAGE_CHARS
+# characters, each overlapping the previous one by about PASSAGE_OVERLAP so a
+# phrase on a boundary is whole in one of them. However large a section
+# grows, a search hit only scans and returns one passage.
+PASSAGE_CHARS = 1000
+PASSAGE_OVERLAP = 150
+PASSAGE_BATCH_SIZE = 500
+
+# Passages go with their section, whoever deletes it.
+PASSAGE_DDL = """
+    CREATE TRIGGER IF NOT EXISTS sections_passages_ad AFTER DELETE ON sections BEGIN
+        DELETE FROM passages WHERE section_id = old.id;
+    END
+"""
+
+
+def split_passages(content: str, size: int = PASSAGE_CHARS, overlap: int = PASSAGE_OVERLAP) -> list:
+    """
+    (start, end) character offsets of the passages of `content`: at most
+    `size` long, cut at the last whitespace of the window where there is
+    one, and each starting at a word boundary about `overlap` characters
+    before the previous one ends. Empty content is one empty passage, so
+    the section title stays searchable.
+    """
+    spans = []
+    start = 0
+    while True:
+        end = min(start + size, len(content))
+        if end < len(content):
+            cut = max(content.rfind(" ", start + size // 2, end), content.rfind("\n", start + size // 2, end))
+            if cut > start:
+                end = cut
+        spans.append((start, end))
+        if end >= len(content):
+            return spans
+        next_start = max(end - overlap, start + 1)
+        boundary = min(
+            (i for i in (content.find(" ", next_start, end), content.find("\n", next_start, end)) if i != -1),
+            default=None,
+        )
+        start = boundary + 1 if boundary is not None else next_start
+
+
+def passage_records(section_id: int, standard_id: int, title: str, content: str) -> list:
+    return [
+        {
+            "section_id": section_id,
+            "standard_id": standard_id,
+            "position": position,
+            "start_char": start,
+            "end_char": end,
+            "title": title,
+            "text": (content or "")[start:end],
+        }
+        for position, (start, end) in enumerate(split_passages(content or ""))
+    ]
+
+
+def build_passages(db: Session, standard_id: int = None) -> set:
+    """
+    Split the sections that have no passages yet (of one standard, or all)
+    into passages. Sections are never edited in place, so sections with
+    passages are up to date. Does not commit.
+
+    Returns:
+        set: Ids of the standards that got new passages.
+    """
+    built = set()
+    after_id = 0
+    while True:
+        query = (
+            db.query(Section.id, Section.standard_id, Section.title, Section.content)
+            .filter(Section.id > after_id, ~exists().where(Passage.section_id == Section.id))
+            .order_by(Section.id)
+        )
+        if standard_id is not None:
+            query = query.filter(Section.standard_id == standard_id)
+        rows = query.limit(PASSAGE_BATCH_SIZE).all()
+        if not rows:
+            return built
+        records = [record for row in rows for record in passage_records(*row)]
+        db.execute(insert(Passage), records)
+        built.update(row.standard_id for row in rows)
+        after_id = rows[-1].id
+
+
+def ensure_passages(db: Session) -> set:
+    """Create the cleanup trigger and build passages for sections stored before them."""
+    db.execute(text(PASSAGE_DDL))
+    built = build_passages(db)
+    db.commit()
+    return built
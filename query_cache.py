@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import func
+from database import SessionLocal
+from models import Standard
+from search_index import FTS_SYNTAX, build_match_query
+
+# Search results are kept for QUERY_CACHE_TTL seconds, within QUERY_CACHE_MAX_ENTRIES
+# entries and about QUERY_CACHE_MAX_BYTES of serialised results; beyond either
+# limit the least recently used entries are evicted.
+QUERY_CACHE_TTL = 300
+QUERY_CACHE_MAX_ENTRIES = 2000
+QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_query(q: str) -> str:
+    """
+    Cache key for a search query: the FTS5 expression it runs, lower-cased
+    for plain text (the tokenizer is case-insensitive, but AND/OR/NOT are not).
+    """
+    return build_match_query(q if FTS_SYNTAX.search(q) else q.lower())
+
+
+class QueryCache:
+    """
+    In-process LRU/TTL cache of search results, so hot queries are answered
+    without touching SQLite.
+
+    Every entry records the generation of the standard it was computed for.
+    invalidate(standard) bumps that generation whenever ingestion writes to
+    the standard, which makes exactly its entries stale; other standards
+    keep theirs.
+    """
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 max_bytes: int = QUERY_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, standard, generation, created_at, size)
+        self.generations = {}
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, standard: str) -> int:
+        with self.lock:
+            return self.generations.get(standard, 0)
+
+    def invalidate(self, standard: str):
+        """Mark every cached result for `standard` stale and free their memory."""
+        with self.lock:
+            self.generations[standard] = self.generations.get(standard, 0) + 1
+            self.invalidations += 1
+            for key in [key for key, entry in self.entries.items() if entry[1] == standard]:
+                self.remove(key)
+
+    def get(self, key):
+        """The cached value, or None on a miss or a stale entry."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, standard, generation, created_at, size = entry
+                if generation == self.generations.get(standard, 0) and created_at >= time.time() - self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self.remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, value, standard: str, generation: int):
+        """
+        Store a value computed while the standard was at `generation`. If
+        ingestion has bumped it since, the value may be out of date already
+        and is not stored.
+        """
+        size = len(value) if isinstance(value, bytes) else len(json.dumps(value, default=str))
+        with self.lock:
+            if generation != self.generations.get(standard, 0) or size > self.max_bytes:
+                return
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (value, standard, generation, time.time(), size)
+            self.bytes += size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, standard: str, compute):
+        """Cached value for key, or compute() stored under the standard's current generation."""
+        value = self.get(key)
+        if value is None:
+            generation = self.generation(standard)
+            value = compute()
+            self.put(key, value, standard, generation)
+        return value
+
+    def remove(self, key):
+        # Caller holds the lock.
+        self.bytes -= self.entries.pop(key)[4]
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class CorpusVersion:
+    """
+    Version of the ingested corpus, "<standards>.<sum of revisions>", which
+    changes whenever ingestion writes a standard. Read from the database on
+    first use and again after each invalidate(), so it also survives restarts.
+    """
+
+    def __init__(self):
+        self.value = None
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self) -> str:
+        with self.lock:
+            if self.value is not None:
+                return self.value
+            generation = self.generation
+        with SessionLocal() as db:
+            count, revisions = db.query(func.count(Standard.id), func.coalesce(func.sum(Standard.revision), 0)).one()
+        value = f"{count}.{revisions}"
+        with self.lock:
+            # An ingestion that finished while we were reading makes the value stale.
+            if generation == self.generation:
+                self.value = value
+        return value
+
+    def invalidate(self):
+        with self.lock:
+            self.value = None
+            self.generation += 1
+
+
+search_cache = QueryCache()
+corpus_version = CorpusVersion()
@@ -0,0 +1,76 @@
+import re
+from sqlalchemy.orm import Session
+from models import Standard, Section, Passage
+from search_index import rank_sections
+
+# Sections retrieved per question and the share of the prompt they may use.
+RETRIEVAL_TOP_K = 5
+CONTEXT_TOKEN_BUDGET = 1500
+# Rough size of a token in characters, good enough for budgeting English text.
+CHARS_PER_TOKEN = 4
+
+STOPWORDS = {
+    "about", "also", "and", "are", "between", "can", "could", "does", "for", "from", "have", "how",
+    "into", "its", "should", "than", "that", "the", "their", "them", "then", "there", "these", "this",
+    "what", "when", "where", "which", "who", "why", "will", "with", "would", "you", "your",
+}
+WORD = re.compile(r"[A-Za-z0-9]+")
+
+
+def build_retrieval_query(question: str) -> str:
+    """
+    FTS5 query matching passages that contain any significant word of the
+    question; BM25 then favours the passages sharing the most (and rarest)
+    of them.
+    """
+    terms = []
+    for word in WORD.findall(question.lower()):
+        if len(word) > 2 and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def retrieve_sections(db: Session, question: str, k: int = RETRIEVAL_TOP_K) -> list:
+    """
+    Top-k sections across all standards for a question, each with its
+    best-matching passage: rows of (id, standard, section_number, title, text).
+    """
+    match = build_retrieval_query(question)
+    if not match:
+        return []
+    return (
+        rank_sections(
+            db, match, Section.id, Standard.name.label("standard"), Section.section_number, Section.title,
+            Passage.text,
+        )
+        .join(Standard, Standard.id == Section.standard_id)
+        .limit(k)
+        .all()
+    )
+
+
+def build_context(hits: list, token_budget: int = CONTEXT_TOKEN_BUDGET):
+    """
+    Pack retrieved passages into a prompt context of at most token_budget
+    tokens, best match first; each excerpt is cut to fit what is left.
+
+    Returns:
+        tuple: (context text, citations for the sections that made it in)
+    """
+    remaining = token_budget * CHARS_PER_TOKEN
+    blocks = []
+    citations = []
+    for hit in hits:
+        header = f"[{hit.standard} {hit.section_number}] {hit.title}\n"
+        if remaining <= len(header):
+            break
+        excerpt = (hit.text or "")[:remaining - len(header)]
+        blocks.append(header + excerpt)
+        remaining -= len(header) + len(excerpt)
+        citations.append({
+            "section_id": hit.id,
+            "standard": hit.standard,
+            "section_number": hit.section_number,
+            "title": hit.title,
+        })
+    return "\n\n".join(blocks), citations
@@ -0,0 +1,210 @@
+import re
+from sqlalchemy import select, text, table, column, func, literal_column, or_, and_
+from sqlalchemy.orm import Session
+from models import Section, Passage
+
+# External-content FTS5 table over passages(title, text); see passages.py.
+# Triggers keep it in sync with every insert/update/delete on `passages`, so
+# passages written by the parser are searchable as soon as they are committed.
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+        title, text,
+        content='passages', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS passages_fts_ai AFTER INSERT ON passages BEGIN
+        INSERT INTO passages_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS passages_fts_ad AFTER DELETE ON passages BEGIN
+        INSERT INTO passages_fts(passages_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS passages_fts_au AFTER UPDATE ON passages BEGIN
+        INSERT INTO passages_fts(passages_fts, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO passages_fts(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+]
+# The whole-section index that passages_fts replaced.
+DROP_SECTIONS_FTS = [
+    "DROP TRIGGER IF EXISTS sections_fts_ai",
+    "DROP TRIGGER IF EXISTS sections_fts_ad",
+    "DROP TRIGGER IF EXISTS sections_fts_au",
+    "DROP TABLE IF EXISTS sections_fts",
+]
+
+passages_fts = table("passages_fts", column("rowid"), column("rank"))
+
+# Relevance: BM25 with matches in the title weighted TITLE_WEIGHT times those
+# in the text, damped by DEPTH_PENALTY per level of section nesting, so
+# "11 Risk" outranks "11.2.3 Risk" on equal term matches. A section scores as
+# its best passage. BM25 scores are negative, lower is better.
+TITLE_WEIGHT = 5.0
+CONTENT_WEIGHT = 1.0
+DEPTH_PENALTY = 0.15
+
+# Characters / operators that mean the caller wrote an explicit FTS5 query.
+FTS_SYNTAX = re.compile(r'["*():^]|\b(AND|OR|NOT|NEAR)\b')
+
+
+def ensure_search_index(db: Session):
+    """
+    Create the FTS5 index and its sync triggers if they do not exist yet.
+    A freshly created index is populated from the existing passages.
+    """
+    for ddl in DROP_SECTIONS_FTS:
+        db.execute(text(ddl))
+    exists = db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'passages_fts'")
+    ).first()
+    for ddl in FTS_DDL:
+        db.execute(text(ddl))
+    if not exists:
+        db.execute(text("INSERT INTO passages_fts(passages_fts) VALUES ('rebuild')"))
+    db.commit()
+
+
+def rebuild_search_index(db: Session):
+    """Rebuild the FTS5 index from scratch out of the `passages` table."""
+    ensure_search_index(db)
+    db.execute(text("INSERT INTO passages_fts(passages_fts) VALUES ('rebuild')"))
+    db.commit()
+
+
+def build_match_query(q: str) -> str:
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    Queries that already use FTS5 syntax (phrases, prefix `*`, AND/OR/NOT,
+    column filters) are passed through unchanged. Plain text is split into
+    terms and each one is quoted, so punctuation such as `project-based`
+    can't produce a syntax error; the terms are implicitly ANDed.
+    """
+    q = q.strip()
+    if FTS_SYNTAX.search(q):
+        return q
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def section_depth():
+    """Nesting level of a section in the section tree (see section_tree.py): top-level sections are 0."""
+    return func.coalesce(Section.depth, 0)
+
+
+def unindexed(column):
+    """
+    `column` as an expression SQLite can't use an index for. Filtering
+    passages by standard through ix_passages_standard_id would make the
+    planner run the full-text MATCH once per passage of the standard; this
+    keeps the MATCH as the outer loop and checks the standard per hit.
+    """
+    return column + 0
+
+
+def passage_hits(standard_ids: list = None, snippet: int = None):
+    """
+    CTE of the passages matching the :match parameter, as (passage_id,
+    section_id, score) plus a "snippet" of at most `snippet` tokens with
+    matches in <mark> if asked for. It is materialised because bm25() and
+    snippet() only work in the query that runs the MATCH, not under the
+    GROUP BY that rolls passages up to sections.
+    """
+    columns = [
+        Passage.id.label("passage_id"),
+        Passage.section_id,
+        func.bm25(literal_column("passages_fts"), TITLE_WEIGHT, CONTENT_WEIGHT).label("score"),
+    ]
+    if snippet is not None:
+        columns.append(
+            func.snippet(literal_column("passages_fts"), 1, "<mark>", "</mark>", "...", snippet).label("snippet")
+        )
+    query = select(*columns).join(passages_fts, passages_fts.c.rowid == Passage.id).where(
+        text("passages_fts MATCH :match")
+    )
+    if standard_ids is not None:
+        query = query.where(unindexed(Passage.standard_id).in_(standard_ids))
+    return query.cte("passage_hits").prefix_with("MATERIALIZED")
+
+
+def rank_sections(db: Session, match: str, *entities, standard_ids: list = None, snippet: int = None,
+                  with_score: bool = False, after: tuple = None):
+    """
+    Query for the sections with a passage matching the FTS5 expression
+    `match`, most relevant first: a section scores as its best passage,
+    damped by its depth, ties broken by id. Pass columns as `entities` to
+    select only those instead of whole sections; Passage columns come from
+    each section's best passage, and so does the "snippet" column added when
+    `snippet` is given. `with_score` adds the "score" column, lower is
+    better. `after` = (score, section id) keeps only the sections ranked
+    after that one.
+    """
+    hits = passage_hits(standard_ids, snippet)
+    score = func.min(hits.c.score * (1.0 / (1 + DEPTH_PENALTY * section_depth())))
+    columns = list(entities or (Section,))
+    if snippet is not None:
+        columns.append(hits.c.snippet)
+    if with_score:
+        columns.append(score.label("score"))
+    query = (
+        db.query(*columns)
+        .select_from(hits)
+        .join(Section, Section.id == hits.c.section_id)
+        .join(Passage, Passage.id == hits.c.passage_id)
+        .group_by(hits.c.section_id)
+    )
+    if after is not None:
+        query = query.having(or_(score > after[0], and_(score == after[0], Section.id > after[1])))
+    # SQLite takes the other (bare) columns of a min() aggregate from the row
+    # holding the minimum, i.e. the best passage.
+    return query.params(match=match).order_by(score, Section.id)
+
+
+def match_sections(db: Session, q: str, standard_id: int, *entities, after_id: int = None, snippet: int = None):
+    """
+    Query for the sections of a standard matching `q`, most relevant first
+    (see rank_sections()). Pass columns as `entities` to select only those
+    instead of whole sections, and `snippet` to add a "snippet" of the best
+    passage.
+
+    `after_id` continues a ranked listing after that section: the keyset is
+    (relevance, id), so pages stay stable without OFFSET scans. Raises
+    ValueError if `after_id` is not itself a match for `q`.
+    """
+    match = build_match_query(q)
+    after = None
+    if after_id is not None:
+        anchor = (
+            rank_sections(db, match, Section.id, standard_ids=[standard_id], with_score=True)
+            .filter(Section.id == after_id)
+            .first()
+        )
+        if anchor is None:
+            raise ValueError(f"Section {after_id} is not a match for '{q}'.")
+        after = (anchor.score, after_id)
+    return rank_sections(db, match, *entities, standard_ids=[standard_id], snippet=snippet, after=after)
+
+
+def count_matches_by_standard(db: Session, q: str, standard_ids) -> dict:
+    """
+    Count the sections matching `q` in each of `standard_ids` with a single
+    index lookup. Standards without a match are absent from the result.
+    """
+    rows = (
+        db.query(Passage.standard_id, func.count(Passage.section_id.distinct()))
+        .join(passages_fts, passages_fts.c.rowid == Passage.id)
+        .filter(unindexed(Passage.standard_id).in_(standard_ids), text("passages_fts MATCH :match"))
+        .params(match=build_match_query(q))
+        .group_by(Passage.standard_id)
+        .all()
+    )
+    return dict(rows)
@@ -0,0 +1,83 @@
+import re
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from models import Section
+
+# Leading section number of a heading, e.g. "4.2.3" out of "4.2.3 Scope".
+SECTION_NUMBER = re.compile(r"\d+(?:\.\d+)*")
+# Digits per path component, i.e. up to a million sections per standard.
+PATH_WIDTH = 6
+
+
+def number_parts(section_number: str) -> tuple:
+    """(4, 2, 3) for "4.2.3 ..."; () when the section is not numbered."""
+    match = SECTION_NUMBER.match(section_number or "")
+    return tuple(int(part) for part in match.group().split(".")) if match else ()
+
+
+def subtree_range(path: str) -> tuple:
+    """
+    (low, high) bounds such that low <= p < high holds exactly for `path`
+    and its descendants: components are fixed-width digits and "/" sorts
+    just below "0".
+    """
+    return path, path + "0"
+
+
+def build_section_tree(db: Session, standard_id: int, positions: dict = None):
+    """
+    Recompute parent_id, depth and path for the sections of a standard, in
+    document order. `positions` ({section_id: position}) moves existing
+    sections first, e.g. when a re-parse inserted sections before them.
+
+    A section's parent is the nearest preceding section whose number is a
+    proper prefix of its own ("4.2" for "4.2.3", or "4" if there is no 4.2).
+    The path joins the zero-padded positions of its ancestors and itself
+    with "/", so a subtree is one index range and ordering by path gives the
+    table of contents. Only rows whose values change are written; does not
+    commit.
+    """
+    positions = positions or {}
+    rows = [
+        dict(row._mapping)
+        for row in db.query(
+            Section.id, Section.section_number, Section.position, Section.parent_id, Section.depth, Section.path,
+        ).filter(Section.standard_id == standard_id)
+    ]
+    for row in rows:
+        row["old"] = (row["position"], row["parent_id"], row["depth"], row["path"])
+        row["position"] = positions.get(row["id"], row["position"])
+    rows.sort(key=lambda row: (row["position"] is None, row["position"], row["id"]))
+
+    stack = []  # (number parts, id, path, depth) of the open ancestors
+    changes = []
+    for position, row in enumerate(rows):
+        parts = number_parts(row["section_number"])
+        if parts:
+            while stack and not (len(stack[-1][0]) < len(parts) and parts[:len(stack[-1][0])] == stack[-1][0]):
+                stack.pop()
+        parent = stack[-1] if stack and parts else None
+        path = f"{position:0{PATH_WIDTH}d}"
+        if parent:
+            path = f"{parent[2]}/{path}"
+        values = (position, parent[1] if parent else None, parent[3] + 1 if parent else 0, path)
+        if values != row["old"]:
+            changes.append(dict(zip(("id", "position", "parent_id", "depth", "path"), (row["id"], *values))))
+        if parts:
+            stack.append((parts, row["id"], path, values[2]))
+    if changes:
+        db.execute(update(Section), changes)
+
+
+def ensure_section_tree(db: Session):
+    """
+    Build the tree for standards whose sections predate it. Sections were
+    always inserted in document order, so their ids give the initial order.
+    """
+    standard_ids = [
+        row.standard_id for row in
+        db.query(Section.standard_id).filter(Section.path.is_(None)).distinct()
+    ]
+    for standard_id in standard_ids:
+        build_section_tree(db, standard_id)
+    db.commit()
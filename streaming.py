@@ -0,0 +1,63 @@
+import json
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+class ThinkFilter:
+    """
+    Incrementally drops a leading <think>...</think> block (and the
+    whitespace after it) from streamed model output, matching what
+    the regex in /chat does on the full text.
+
+    Tags may be split across chunks: the start of the output is held back
+    only while it could still be "<think>", and the reasoning is held until
+    "</think>" arrives (it is shown only if the block is never closed).
+    """
+
+    def __init__(self):
+        self.state = "start"  # start -> thinking -> after_think -> answer
+        self.buffer = ""
+        self.scanned = 0
+
+    def feed(self, chunk: str) -> str:
+        """Take the next chunk of output and return the part that is safe to show."""
+        self.buffer += chunk
+        out = ""
+        while self.buffer:
+            if self.state == "start":
+                if self.buffer.startswith(THINK_OPEN):
+                    self.state = "thinking"
+                    self.scanned = 0
+                    continue
+                if THINK_OPEN.startswith(self.buffer):
+                    break  # could still become "<think>"
+                self.state = "answer"
+            elif self.state == "thinking":
+                end = self.buffer.find(THINK_CLOSE, max(0, self.scanned - len(THINK_CLOSE) + 1))
+                if end == -1:
+                    # Keep the reasoning in case the block is never closed.
+                    self.scanned = len(self.buffer)
+                    break
+                self.buffer = self.buffer[end + len(THINK_CLOSE):]
+                self.state = "after_think"
+            elif self.state == "after_think":
+                self.buffer = self.buffer.lstrip()
+                if self.buffer:
+                    self.state = "answer"
+            else:
+                out += self.buffer
+                self.buffer = ""
+        return out
+
+    def finish(self) -> str:
+        """Flush what is held back once the stream has ended."""
+        # An unclosed <think> block is shown as is, as with the regex.
+        out, self.buffer = self.buffer, ""
+        return out
+
+
+def sse_event(data: dict, event: str = None) -> str:
+    """Format one server-sent event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
@@ -0,0 +1,22 @@
+import os
+import tempfile
+import pytest
+
+# Modules that open the app database (backend, query_cache) get a scratch
+# file instead of ./standards.db; set before database.py is imported.
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/standards.db")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+import models  # noqa: F401  (registers the tables on Base.metadata)
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Session on a scratch SQLite database with every table created."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as session:
+        yield session
+    engine.dispose()
@@ -0,0 +1,45 @@
+import time
+from models import Conversation
+from conversations import ConversationStore
+
+# estimate_tokens gives 10 + 40 = 50 tokens for each of these turns.
+QUESTION = "q" * 36
+ANSWER = "a" * 156
+
+
+def store_with_turns(db, count, **options):
+    store = ConversationStore(**options)
+    conversation_id = store.new_id()
+    assert store.get(db, conversation_id) is None  # stored with its first turn
+    for _ in range(count):
+        store.add_turn(db, conversation_id, QUESTION, ANSWER)
+    return store, store.get(db, conversation_id)
+
+
+def test_turns_within_budget_are_sent_verbatim(db):
+    store, conversation = store_with_turns(db, 2, budget=100)
+    to_summarise, history = store.window(db, conversation)
+    assert to_summarise == [] and len(history) == 2
+
+
+def test_overflow_trims_to_fraction_of_budget(db):
+    store, conversation = store_with_turns(db, 3, budget=100, trim_to=0.5)
+    to_summarise, history = store.window(db, conversation)
+    assert len(to_summarise) == 2 and len(history) == 1
+    assert to_summarise[-1].id < history[0].id
+
+    store.save_summary(db, conversation.id, "summary", to_summarise[-1].id)
+    db.refresh(conversation)
+    to_summarise, history = store.window(db, conversation)
+    assert to_summarise == [] and len(history) == 1
+    assert store.to_dict(db, conversation)["summarized_turns"] == 2
+
+
+def test_expired_conversations_are_deleted(db):
+    store, old = store_with_turns(db, 1, ttl=60)
+    db.query(Conversation).filter(Conversation.id == old.id).update({"updated_at": time.time() - 120})
+    db.commit()
+    assert store.get(db, old.id) is None
+
+    store.add_turn(db, store.new_id(), QUESTION, ANSWER)
+    assert db.get(Conversation, old.id) is None
@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+import backend
+from database import SessionLocal
+from models import Standard
+from query_cache import corpus_version
+
+
+@pytest.fixture
+def client():
+    with SessionLocal() as db:
+        db.query(Standard).delete()
+        # Enough rows for the response to pass GZIP_MIN_SIZE.
+        db.add_all(Standard(name=f"S{i}", file_path="files/" + "x" * 40 + ".pdf", revision=1) for i in range(30))
+        db.commit()
+    corpus_version.invalidate()
+    return TestClient(backend.app)
+
+
+def test_revalidation_gets_empty_304_until_ingestion(client):
+    first = client.get("/standards", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+
+    again = client.get("/standards", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["ETag"] == etag
+
+    with SessionLocal() as db:
+        db.query(Standard).filter(Standard.name == "S0").update({"revision": 2})
+        db.commit()
+    corpus_version.invalidate()
+    changed = client.get("/standards", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_gzipped_body_has_its_own_tag(client):
+    plain = client.get("/standards", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/standards", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    again = client.get("/standards", headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["ETag"]})
+    assert again.status_code == 304 and again.headers["ETag"] == gzipped.headers["ETag"]
+    # A gzip tag doesn't revalidate a client that can't take gzip.
+    plain_again = client.get("/standards", headers={"Accept-Encoding": "identity",
+                                                    "If-None-Match": gzipped.headers["ETag"]})
+    assert plain_again.status_code == 200
+
+
+def test_topic_list_is_part_of_the_tag(client, monkeypatch):
+    etag = client.get("/coverage?standards=S0").headers["ETag"]
+    assert client.get("/coverage?standards=S0", headers={"If-None-Match": etag}).status_code == 304
+    monkeypatch.setattr(backend, "ETAG_SALT", "other topics")
+    assert client.get("/coverage?standards=S0", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_writes_and_other_paths_are_not_tagged(client):
+    assert "ETag" not in client.get("/").headers
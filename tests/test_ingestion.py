@@ -0,0 +1,47 @@
+import fitz
+from models import Standard, Section
+from parser import parse_standard_pdf
+
+
+def write_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def sections(db, standard_id):
+    rows = db.query(Section.id, Section.section_number, Section.content).filter(Section.standard_id == standard_id)
+    return {row.section_number: (row.id, row.content) for row in rows}
+
+
+def test_unchanged_file_is_not_parsed_again(db, tmp_path):
+    path = write_pdf(tmp_path / "a.pdf", ["1 Scope\nscope text", "2 Terms\nterms text"])
+    standard_id = parse_standard_pdf(path, db, "A")
+    before = sections(db, standard_id)
+
+    counts = {}
+    assert parse_standard_pdf(path, db, "A", progress=counts.update) == standard_id
+    assert counts == {"unchanged": True}
+    assert sections(db, standard_id) == before
+    assert db.get(Standard, standard_id).revision == 1
+
+
+def test_revised_file_rewrites_only_changed_sections(db, tmp_path):
+    path = write_pdf(tmp_path / "a.pdf", ["1 Scope\nscope text", "2 Terms\nterms text"])
+    standard_id = parse_standard_pdf(path, db, "A")
+    before = sections(db, standard_id)
+
+    write_pdf(tmp_path / "a.pdf", ["1 Scope\nscope text", "2 Terms\nrevised terms"])
+    counts = {}
+    assert parse_standard_pdf(path, db, "A", progress=counts.update) == standard_id
+    after = sections(db, standard_id)
+
+    assert counts["sections_unchanged"] == 1 and counts["sections_written"] == 1
+    assert after["1"] == before["1"]
+    assert after["2"][0] != before["2"][0] and "revised terms" in after["2"][1]
+    assert db.query(Section).filter(Section.id == before["2"][0]).count() == 0
+    assert db.query(Standard).count() == 1
+    assert db.get(Standard, standard_id).revision == 2
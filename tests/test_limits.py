@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from limits import ConcurrencyLimiter, Saturated
+
+
+def test_rejects_immediately_when_slots_and_queue_are_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=1, queue_timeout=5, retry_after=7)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["queued"] == 1
+        with pytest.raises(Saturated) as error:
+            await limiter.acquire()
+        assert error.value.retry_after == 7
+        limiter.release()
+        await waiter
+        return limiter.stats()
+
+    assert asyncio.run(scenario()) == {"max_concurrent": 1, "active": 1, "queued": 0, "rejected": 1}
+
+
+def test_queued_caller_gives_up_after_queue_timeout():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=5, queue_timeout=0.05, retry_after=1)
+        async with limiter.slot():
+            with pytest.raises(Saturated):
+                await limiter.acquire()
+        return limiter.stats()
+
+    assert asyncio.run(scenario()) == {"max_concurrent": 1, "active": 0, "queued": 0, "rejected": 1}
+
+
+def test_slot_is_released_when_the_call_fails():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queued=0, queue_timeout=1, retry_after=1)
+        with pytest.raises(ValueError):
+            async with limiter.slot():
+                raise ValueError("upstream failed")
+        async with limiter.slot():
+            pass
+        return limiter.stats()
+
+    assert asyncio.run(scenario())["rejected"] == 0
@@ -0,0 +1,38 @@
+from parser import iter_lines, iter_sections
+
+
+def sections(pages, max_section_chars=200_000):
+    return list(iter_sections(iter_lines(enumerate(pages)), max_section_chars))
+
+
+def test_lines_continue_across_pages():
+    assert list(iter_lines([(0, "1 Scope\nThe sco"), (1, "pe of it\n")])) == [
+        (0, "1 Scope"), (1, "The scope of it"), (1, ""),
+    ]
+
+
+def test_sections_split_at_headings():
+    result = sections(["1 Scope\nbody one\n2 Terms\n", "body two\n"])
+    assert [(heading, body, first, last) for heading, body, first, last in result] == [
+        ("1 Scope", ["body one"], 0, 0),
+        ("2 Terms", ["body two", ""], 0, 1),
+    ]
+
+
+def test_front_matter_is_carried_into_first_section():
+    result = sections(["Front matter preface text\n", "1 Scope\nbody\n"])
+    heading, body, first_page, last_page = result[0]
+    assert heading == "1 Scope"
+    assert body[0] == "Front matter preface text"
+    assert "body" in body
+    assert (first_page, last_page) == (0, 1)
+
+
+def test_long_section_is_split_into_records_with_same_heading():
+    result = sections(["1 Scope\n" + "x" * 40 + "\n" + "y" * 40 + "\n"], max_section_chars=50)
+    assert [heading for heading, *_ in result] == ["1 Scope", "1 Scope"]
+    assert "".join(line for _, body, *_ in result for line in body) == "x" * 40 + "y" * 40
+
+
+def test_no_headings_yields_nothing():
+    assert sections(["just some text\n"]) == []
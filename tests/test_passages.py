@@ -0,0 +1,33 @@
+from passages import split_passages, passage_records
+
+
+def test_empty_content_is_one_empty_passage():
+    assert split_passages("") == [(0, 0)]
+
+
+def test_short_content_is_one_passage():
+    assert split_passages("a short section", size=100) == [(0, 15)]
+
+
+def test_passages_are_bounded_overlapping_and_cover_content():
+    content = " ".join(f"word{i}" for i in range(500))
+    spans = split_passages(content, size=100, overlap=20)
+    assert spans[0][0] == 0 and spans[-1][1] == len(content)
+    for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+        assert end - start <= 100
+        assert start < next_start < end <= next_end
+        assert content[next_start - 1] == " "
+
+
+def test_unbroken_text_is_cut_at_size():
+    spans = split_passages("x" * 250, size=100, overlap=10)
+    assert all(end - start <= 100 for start, end in spans)
+    assert spans[-1][1] == 250
+
+
+def test_passage_records_slice_the_content():
+    content = "alpha beta gamma delta"
+    records = passage_records(7, 1, "Title", content)
+    assert [r["text"] for r in records] == [content]
+    assert records[0]["section_id"] == 7 and records[0]["position"] == 0
+    assert passage_records(8, 1, "Empty", None)[0]["text"] == ""
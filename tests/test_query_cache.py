@@ -0,0 +1,47 @@
+from query_cache import QueryCache
+
+
+def test_invalidate_drops_only_that_standards_entries():
+    cache = QueryCache()
+    cache.put("risk@A", ["a"], "A", cache.generation("A"))
+    cache.put("risk@B", ["b"], "B", cache.generation("B"))
+    cache.invalidate("A")
+    assert cache.get("risk@A") is None
+    assert cache.get("risk@B") == ["b"]
+
+
+def test_value_computed_before_an_invalidation_is_not_stored():
+    cache = QueryCache()
+    generation = cache.generation("A")
+    cache.invalidate("A")  # ingestion finished while the query ran
+    cache.put("risk@A", ["stale"], "A", generation)
+    assert cache.get("risk@A") is None
+
+    cache.put("risk@A", ["fresh"], "A", cache.generation("A"))
+    assert cache.get("risk@A") == ["fresh"]
+
+
+def test_get_or_compute_caches_until_invalidated():
+    cache = QueryCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [len(calls)]
+
+    assert cache.get_or_compute("k", "A", compute) == [1]
+    assert cache.get_or_compute("k", "A", compute) == [1]
+    cache.invalidate("A")
+    assert cache.get_or_compute("k", "A", compute) == [2]
+
+
+def test_expired_and_overflowing_entries_are_evicted():
+    cache = QueryCache(ttl=-1)
+    cache.put("k", [1], "A", 0)
+    assert cache.get("k") is None
+
+    cache = QueryCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, [key], "A", 0)
+    assert cache.get("a") is None and cache.get("c") == ["c"]
+    assert cache.stats()["evictions"] == 1
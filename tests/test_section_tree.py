@@ -0,0 +1,38 @@
+from models import Section
+from section_tree import build_section_tree, subtree_range, number_parts
+
+
+def test_number_parts():
+    assert number_parts("4.2.3") == (4, 2, 3)
+    assert number_parts("Annex") == ()
+
+
+def test_parents_depths_and_paths_follow_section_numbers(db):
+    numbers = ["1", "1.1", "1.1.1", "1.2", "2", "2.3.1", "Annex"]
+    db.add_all(Section(standard_id=1, section_number=number, position=i) for i, number in enumerate(numbers))
+    db.flush()
+    build_section_tree(db, 1)
+    rows = {s.section_number: s for s in db.query(Section)}
+
+    assert rows["1"].parent_id is None and rows["1"].depth == 0
+    assert rows["1.1"].parent_id == rows["1"].id
+    assert rows["1.1.1"].parent_id == rows["1.1"].id and rows["1.1.1"].depth == 2
+    assert rows["1.2"].parent_id == rows["1"].id
+    # No 2.3, so 2.3.1 hangs off 2.
+    assert rows["2.3.1"].parent_id == rows["2"].id
+    assert rows["Annex"].parent_id is None
+
+    low, high = subtree_range(rows["1"].path)
+    subtree = sorted(s.section_number for s in rows.values() if low <= s.path < high)
+    assert subtree == ["1", "1.1", "1.1.1", "1.2"]
+    assert [s.section_number for s in sorted(rows.values(), key=lambda s: s.path)] == numbers
+
+
+def test_positions_move_existing_sections(db):
+    db.add_all(Section(standard_id=1, section_number=number, position=i) for i, number in enumerate(["1", "2"]))
+    db.flush()
+    build_section_tree(db, 1)
+    first, second = db.query(Section).order_by(Section.id).all()
+    build_section_tree(db, 1, {first.id: 1, second.id: 0})
+    db.expire_all()
+    assert [s.section_number for s in db.query(Section).order_by(Section.path)] == ["2", "1"]
@@ -0,0 +1,27 @@
+from streaming import ThinkFilter, sse_event
+
+
+def run(chunks):
+    think_filter = ThinkFilter()
+    return "".join(think_filter.feed(chunk) for chunk in chunks) + think_filter.finish()
+
+
+def test_think_block_is_dropped():
+    assert run(["<think>reasoning</think>\n\nThe answer."]) == "The answer."
+
+
+def test_tags_split_across_chunks():
+    assert run(["<th", "ink>rea", "soning</th", "ink>", "\n", "\nThe ", "answer."]) == "The answer."
+
+
+def test_output_without_think_block_passes_through():
+    assert run(["<b>", "bold</b>"]) == "<b>bold</b>"
+
+
+def test_unclosed_think_block_is_shown():
+    assert run(["<think>still reasoning"]) == "<think>still reasoning"
+
+
+def test_sse_event_format():
+    assert sse_event({"delta": "hi"}) == 'data: {"delta": "hi"}\n\n'
+    assert sse_event({}, event="done") == "event: done\ndata: {}\n\n"
@@ -0,0 +1,100 @@
+import json
+from sqlalchemy.orm import Session
+from models import Standard, Section, TopicCoverage
+from search_index import build_match_query, rank_sections
+
+# Topics shown on the Dashboard. Their coverage per standard is stored in the
+# topic_coverage table: refreshed when a standard is parsed, and on startup
+# for topics added to this list or standards not covered yet.
+COVERAGE_TOPICS = [
+    # PMBOK 7th Edition: Project Performance Domains
+    "Stakeholders", "Team", "Development Approach and Life Cycle", "Planning",
+    "Project Work", "Delivery", "Measurement", "Uncertainty",
+    # PMBOK 7th Edition: Core Principles & Concepts
+    "Stewardship", "Value Delivery", "Tailoring", "Models, Methods, and Artifacts",
+    # PRINCE2 7th Edition: Practices (formerly Themes)
+    "Business Case", "Organizing", "Quality", "Risk", "Issues", "Progress",
+    # PRINCE2 7th Edition: Processes
+    "Starting up a Project", "Directing a Project", "Initiating a Project",
+    "Controlling a Stage", "Managing Product Delivery", "Managing a Stage Boundary", "Closing a Project",
+    # PRINCE2 7th Edition: Principles
+    "Continued Business Justification", "Learn from Experience", "Defined Roles and Responsibilities",
+    "Manage by Stages", "Manage by Exception", "Focus on Products", "Tailor to Suit the Project Environment",
+    # Common & Cross-Cutting Topics
+    "Change Control", "Agile Practices", "Project Governance", "Lessons Learned",
+    "Benefits Management", "Sustainability"
+]
+
+
+def refresh_coverage(db: Session, standard_ids: list, topics: list = COVERAGE_TOPICS):
+    """
+    Recompute the coverage rows of `topics` for `standard_ids`: one index
+    lookup per topic across all the standards. Standards without a match get
+    a zero row, so missing rows always mean "not computed yet". Does not
+    commit, so the parser can include it in its transaction.
+    """
+    if not standard_ids or not topics:
+        return
+    db.query(TopicCoverage).filter(
+        TopicCoverage.standard_id.in_(standard_ids), TopicCoverage.topic.in_(topics),
+    ).delete(synchronize_session=False)
+    rows = []
+    for topic in topics:
+        matches = {standard_id: ([], 0.0) for standard_id in standard_ids}
+        hits = rank_sections(
+            db, build_match_query(topic), Section.standard_id, Section.id,
+            standard_ids=standard_ids, with_score=True,
+        )
+        for standard_id, section_id, score in hits:
+            ids, total = matches[standard_id]
+            ids.append(section_id)
+            matches[standard_id] = (ids, total - score)
+        for standard_id, (ids, total) in matches.items():
+            rows.append(TopicCoverage(
+                topic=topic, standard_id=standard_id, count=len(ids),
+                section_ids=json.dumps(ids), score=round(total, 4),
+            ))
+    db.add_all(rows)
+    db.flush()
+
+
+def ensure_coverage(db: Session, topics: list = COVERAGE_TOPICS):
+    """
+    Bring topic_coverage in line with `topics` and the stored standards:
+    rows for topics no longer listed (or deleted standards) are dropped, and
+    missing topic/standard pairs are computed.
+    """
+    standard_ids = [row.id for row in db.query(Standard.id)]
+    db.query(TopicCoverage).filter(
+        TopicCoverage.topic.notin_(topics) | TopicCoverage.standard_id.notin_(standard_ids)
+    ).delete(synchronize_session=False)
+    stored = {}
+    for topic, standard_id in db.query(TopicCoverage.topic, TopicCoverage.standard_id):
+        stored.setdefault(standard_id, set()).add(topic)
+    for standard_id in standard_ids:
+        missing = [topic for topic in topics if topic not in stored.get(standard_id, ())]
+        refresh_coverage(db, [standard_id], missing)
+    db.commit()
+
+
+def coverage_matrix(db: Session, standards: dict, topics: list = COVERAGE_TOPICS,
+                    with_sections: bool = False) -> dict:
+    """
+    Stored coverage as a topics x standards matrix, for `standards` given as
+    {name: id} in display order.
+    """
+    cells = {
+        (row.topic, row.standard_id): row
+        for row in db.query(TopicCoverage).filter(TopicCoverage.standard_id.in_(list(standards.values())))
+    }
+    empty = TopicCoverage(count=0, score=0.0, section_ids="[]")
+    grid = [[cells.get((topic, standard_id), empty) for standard_id in standards.values()] for topic in topics]
+    matrix = {
+        "topics": topics,
+        "standards": list(standards),
+        "counts": [[cell.count for cell in row] for row in grid],
+        "scores": [[cell.score for cell in row] for row in grid],
+    }
+    if with_sections:
+        matrix["section_ids"] = [[json.loads(cell.section_ids) for cell in row] for row in grid]
+    return matrix